@@ -0,0 +1,132 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+import data_store
+
+# Precomputed rollups of Main.csv. The pages used to run a pandas groupby (or a per-year list comprehension) for every chart on every rerun; the cube does all of that once per dataset version with np.add.at over factorized codes, and each chart then only slices a NumPy array.
+
+TOTAL = 'TOTAL'
+
+
+class AggregateCube:
+
+    def __init__(self, main):
+        self.years = data_store.year_columns(main)
+        self.countries = np.array(sorted(main['Country'].unique()), dtype=object)
+        self.indicators = np.array(sorted(main['Indicator'].unique()), dtype=object)
+        self.country_index = {name: i for i, name in enumerate(self.countries)}
+        self.indicator_index = {name: i for i, name in enumerate(self.indicators)}
+
+        c = main['Country'].map(self.country_index).to_numpy()
+        i = main['Indicator'].map(self.indicator_index).to_numpy()
+        counts = main[self.years].to_numpy(dtype=np.float64)
+        totals = main['Total'].to_numpy(dtype=np.float64)
+        shape = (len(self.countries), len(self.indicators))
+
+        self.indicator_year = np.zeros((len(self.indicators), len(self.years)))
+        np.add.at(self.indicator_year, i, counts)
+
+        self.country_indicator = np.zeros(shape)
+        np.add.at(self.country_indicator, (c, i), totals)
+
+        self.present = np.zeros(shape, dtype=bool)
+        self.present[c, i] = True
+
+        hazard_rows = main['Indicator'].to_numpy() != TOTAL
+        self.country_year = np.zeros((len(self.countries), len(self.years)))
+        np.add.at(self.country_year, c[hazard_rows], counts[hazard_rows])
+
+        indicator_totals = np.zeros(len(self.indicators))
+        np.add.at(indicator_totals, i, totals)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.year_share = np.nan_to_num(self.indicator_year / indicator_totals[:, None] * 100)
+
+        for array in (self.indicator_year, self.country_indicator, self.present, self.country_year, self.year_share):
+            array.flags.writeable = False
+
+    # A copy of the cube with the contribution of `old_rows` replaced by that of `new_rows` (both in the Main.csv layout, old_rows empty for rows that are new). Returns None when the rows bring a country, indicator or year the cube has no slot for, in which case it has to be rebuilt.
+
+    def patched(self, old_rows, new_rows):
+        if data_store.year_columns(new_rows) != self.years:
+            return None
+        if not (set(new_rows['Country']) <= self.country_index.keys() and set(new_rows['Indicator']) <= self.indicator_index.keys()):
+            return None
+
+        cube = copy.copy(self)
+        cube.indicator_year = self.indicator_year.copy()
+        cube.country_indicator = self.country_indicator.copy()
+        cube.present = self.present.copy()
+        cube.country_year = self.country_year.copy()
+
+        for rows, sign in ((old_rows, -1), (new_rows, 1)):
+            c = rows['Country'].map(self.country_index).to_numpy(dtype=np.intp)
+            i = rows['Indicator'].map(self.indicator_index).to_numpy(dtype=np.intp)
+            counts = sign * rows[self.years].to_numpy(dtype=np.float64)
+            np.add.at(cube.indicator_year, i, counts)
+            np.add.at(cube.country_indicator, (c, i), sign * rows['Total'].to_numpy(dtype=np.float64))
+            hazard_rows = rows['Indicator'].to_numpy() != TOTAL
+            np.add.at(cube.country_year, c[hazard_rows], counts[hazard_rows])
+        c = new_rows['Country'].map(self.country_index).to_numpy(dtype=np.intp)
+        cube.present[c, new_rows['Indicator'].map(self.indicator_index).to_numpy(dtype=np.intp)] = True
+
+        indicator_totals = cube.country_indicator.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cube.year_share = np.nan_to_num(cube.indicator_year / indicator_totals[:, None] * 100)
+
+        for array in (cube.indicator_year, cube.country_indicator, cube.present, cube.country_year, cube.year_share):
+            array.flags.writeable = False
+        return cube
+
+    # Sum of one year's counts for every indicator, TOTAL rows excluded, in the shape of the old groupby('Indicator').sum() result.
+
+    def indicator_totals(self, year):
+        keep = self.indicators != TOTAL
+        return pd.DataFrame({
+            'Indicator': self.indicators[keep],
+            year: self.indicator_year[keep, self.years.index(year)],
+        })
+
+    # Occurrences of every indicator (TOTAL rows included) in one year, as the dashboard reports it.
+
+    def year_total(self, year):
+        return self.indicator_year[:, self.years.index(year)].sum()
+
+    # Total occurrences per country for one indicator, limited to countries that have a row for it.
+
+    def country_totals(self, indicator):
+        column = self.indicator_index[indicator]
+        keep = self.present[:, column]
+        return pd.DataFrame({
+            'Country': self.countries[keep],
+            'Total': self.country_indicator[keep, column],
+        })
+
+    # Total occurrences of every indicator (TOTAL rows excluded) for one country.
+
+    def country_indicator_totals(self, country):
+        row = self.country_index[country]
+        keep = self.present[row] & (self.indicators != TOTAL)
+        return pd.DataFrame({
+            'Indicator': self.indicators[keep],
+            'Total': self.country_indicator[row, keep],
+        })
+
+    def country_year_counts(self, country):
+        return pd.DataFrame({
+            'Year': self.years,
+            'Total': self.country_year[self.country_index[country]],
+        })
+
+    # Each year's share of an indicator's total occurrences, in percent.
+
+    def year_shares(self, indicator):
+        return pd.DataFrame({
+            'Year': self.years,
+            'Percentage': self.year_share[self.indicator_index[indicator]],
+        })
+
+
+def cube():
+    return data_store.derived("Main.csv", "cube", AggregateCube)
@@ -0,0 +1,273 @@
+import json
+import hashlib
+import logging
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+import data_store
+import aggregates
+import sparse_counts
+
+# Headless JSON API over the numbers the dashboard shows, for services that need them without rendering any charts. It runs on the same process-wide caches as the pages (data_store, the aggregate cube, the forecast cache), so a request is a lookup rather than a CSV parse.
+#
+#   GET /countries                         list of countries
+#   GET /indicators                        list of disaster types
+#   GET /years                             list of years
+#   GET /country-totals?country=..         total occurrences per disaster type for each country
+#   GET /year-distribution?year=..         occurrences per disaster type across all countries in each year
+#   GET /year-shares?indicator=..          each year's share (%) of a disaster type's total
+#   GET /series?country=..&indicator=..    yearly counts of each (country, disaster type) pair
+#   GET /top-countries?indicator=..&k=..   the k countries (default 10) with the most occurrences, of each disaster type or of all (TOTAL)
+#   GET /similar?country=..&indicator=..   the k countries (default 5) whose yearly counts are most like each country's; optional metric= (see similarity.METRICS)
+#   GET /forecast?country=..&indicator=..  five-year forecasts; optional method= (see forecasting.METHODS) and steps=
+#
+# Every parameter can be repeated or given as a comma-separated list, so one request can ask for many countries, disaster types or years; /country-totals also takes indicator= to restrict the types. Responses carry an ETag derived from the dataset version and the query, and a request with a matching If-None-Match header is answered with 304 before anything is computed.
+
+logger = logging.getLogger(__name__)
+
+TOTAL = 'TOTAL'
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _values(params, name, required=True):
+    values = [value for item in params.get(name, []) for value in item.split(',') if value]
+    if required and not values:
+        raise BadRequest(f"missing parameter '{name}'")
+    return values
+
+
+def _check(values, known, what):
+    unknown = [value for value in values if value not in known]
+    if unknown:
+        raise BadRequest(f"unknown {what}: {', '.join(unknown)}")
+    return values
+
+
+def _hazards(cube):
+    return [indicator for indicator in cube.indicators if indicator != TOTAL]
+
+
+def countries(params):
+    return list(aggregates.cube().countries)
+
+
+def indicators(params):
+    return _hazards(aggregates.cube())
+
+
+def years(params):
+    return aggregates.cube().years
+
+
+def country_totals(params):
+    cube = aggregates.cube()
+    selected = _check(_values(params, 'country'), cube.country_index, "country")
+    wanted = _check(_values(params, 'indicator', required=False), cube.indicator_index, "indicator") or _hazards(cube) + [TOTAL]
+    return {
+        country: {
+            indicator: float(cube.country_indicator[cube.country_index[country], cube.indicator_index[indicator]])
+            for indicator in wanted
+        }
+        for country in selected
+    }
+
+
+def year_distribution(params):
+    cube = aggregates.cube()
+    selected = _check(_values(params, 'year'), cube.years, "year")
+    hazards = _hazards(cube)
+    rows = [cube.indicator_index[indicator] for indicator in hazards]
+    return {
+        year: dict(zip(hazards, cube.indicator_year[rows, cube.years.index(year)].tolist()))
+        for year in selected
+    }
+
+
+def year_shares(params):
+    cube = aggregates.cube()
+    selected = _check(_values(params, 'indicator'), cube.indicator_index, "indicator")
+    return {
+        indicator: dict(zip(cube.years, cube.year_share[cube.indicator_index[indicator]].tolist()))
+        for indicator in selected
+    }
+
+
+def series(params):
+    cube = aggregates.cube()
+    long_table = data_store.long_table()
+    selected = _check(_values(params, 'country'), cube.country_index, "country")
+    wanted = _check(_values(params, 'indicator'), cube.indicator_index, "indicator")
+    result = {}
+    for country in selected:
+        result[country] = {}
+        for indicator in wanted:
+            rows = long_table.series(country, indicator)
+            counts = dict(zip(rows['Year'].astype(str), rows['Count'].tolist()))
+            result[country][indicator] = {year: counts.get(year, 0) for year in cube.years}
+    return result
+
+
+def top_countries(params):
+    counts = sparse_counts.sparse_counts()
+    wanted = _check(_values(params, 'indicator', required=False), list(counts.indicator_index) + [TOTAL], "indicator") or [TOTAL]
+    try:
+        k = int((_values(params, 'k', required=False) or [10])[0])
+    except ValueError:
+        raise BadRequest("k must be an integer")
+    if k < 1:
+        raise BadRequest("k must be at least 1")
+
+    result = {}
+    for indicator in wanted:
+        top = counts.top_countries(k, indicator)
+        result[indicator] = [{"country": country, "total": total} for country, total in zip(top['Country'], top['Total'].tolist())]
+    return result
+
+
+def similar(params):
+    import similarity
+
+    counts = sparse_counts.sparse_counts()
+    selected = _check(_values(params, 'country'), counts.country_index, "country")
+    wanted = _check(_values(params, 'indicator', required=False), list(counts.indicator_index) + [TOTAL], "indicator") or [TOTAL]
+    metric = (_values(params, 'metric', required=False) or ["Cosine"])[0]
+    _check([metric], similarity.METRICS, "metric")
+    try:
+        k = int((_values(params, 'k', required=False) or [5])[0])
+    except ValueError:
+        raise BadRequest("k must be an integer")
+    if k < 1:
+        raise BadRequest("k must be at least 1")
+
+    result = {}
+    for country in selected:
+        result[country] = {}
+        for indicator in wanted:
+            rows = similarity.similar(country, indicator, metric, k)
+            result[country][indicator] = [{"country": name, "score": score} for name, score in zip(rows['Country'], rows['Score'].tolist())]
+    return {"metric": metric, "similar": result}
+
+
+def forecast(params):
+    import forecasting
+
+    cube = aggregates.cube()
+    selected = _check(_values(params, 'country'), cube.country_index, "country")
+    wanted = _check(_values(params, 'indicator'), _hazards(cube), "indicator")
+    method = (_values(params, 'method', required=False) or ["ARIMA"])[0]
+    _check([method], forecasting.METHODS, "method")
+    try:
+        steps = int((_values(params, 'steps', required=False) or [forecasting.STEPS])[0])
+    except ValueError:
+        raise BadRequest("steps must be an integer")
+    if not 1 <= steps <= 20:
+        raise BadRequest("steps must be between 1 and 20")
+
+    result = {}
+    for country in selected:
+        result[country] = {}
+        for indicator in wanted:
+            predictions = forecasting.forecast(country, indicator, steps=steps, method=method)
+            result[country][indicator] = {str(year): float(value) for year, value in zip(predictions.index.year, predictions.values)}
+    return {"method": method, "forecasts": result}
+
+
+ROUTES = {
+    "/countries": countries,
+    "/indicators": indicators,
+    "/years": years,
+    "/country-totals": country_totals,
+    "/year-distribution": year_distribution,
+    "/year-shares": year_shares,
+    "/series": series,
+    "/top-countries": top_countries,
+    "/similar": similar,
+    "/forecast": forecast,
+}
+
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode(body):
+    return json.dumps(body, default=_default).encode()
+
+
+def etag(path, params):
+    query = json.dumps(sorted((name, sorted(values)) for name, values in params.items()))
+    digest = hashlib.sha1(repr((data_store.version("Main.csv"), path, query)).encode())
+    return '"%s"' % digest.hexdigest()
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    server_version = "DisasterDataHub"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path.rstrip('/') or '/')
+        if route is None:
+            return self._send(404, {"error": f"unknown path {url.path}", "paths": sorted(ROUTES)})
+
+        # Any other failure (a model that does not converge, input a route did not expect) is answered with a 500 instead of a dropped connection.
+        try:
+            params = parse_qs(url.query)
+            tag = etag(url.path, params)
+            if tag in [value.strip() for value in self.headers.get("If-None-Match", "").split(',')]:
+                return self._send(304, None, tag)
+            payload = _encode(route(params))
+        except BadRequest as error:
+            return self._send(400, {"error": str(error)})
+        except Exception as error:
+            logger.exception("%s failed", self.path)
+            return self._send(500, {"error": f"{type(error).__name__}: {error}"})
+        self._send(200, payload, tag)
+
+    # `body` is a JSON-serializable value or a payload already encoded by _encode.
+
+    def _send(self, status, body, tag=None):
+        self.send_response(status)
+        if tag is not None:
+            self.send_header("ETag", tag)
+            self.send_header("Cache-Control", "no-cache")
+        if body is None:
+            self.end_headers()
+            return
+        payload = body if isinstance(body, bytes) else _encode(body)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the disaster aggregates as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    logger.info("Serving on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import argparse
+
+# Reports how many bytes every chart of every page sends to the browser with the default selections: the chart spec plus its datasets for Altair charts, the figure JSON for Plotly charts. The pages are run headlessly with Streamlit's AppTest, so the numbers are exactly what a session would receive.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Measure the pages as they are, without the cache warm-up thread (see warmup.py) running alongside.
+os.environ.setdefault("WARMUP", "0")
+
+
+def page_payloads(page):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=120)
+    at.run()
+    at.sidebar.selectbox[0].select(page).run()
+
+    payloads = []
+    for element in at.main:
+        proto = getattr(element, "proto", None)
+        if proto is None or not hasattr(proto, "spec"):
+            continue
+        data = sum(len(dataset.data.data) for dataset in getattr(proto, "datasets", []))
+        payloads.append((element.type, len(proto.spec), data))
+    return payloads
+
+
+def main():
+    import hazard_pages
+
+    parser = argparse.ArgumentParser(description="Measure the bytes each chart sends to the browser.")
+    parser.add_argument("pages", nargs="*", help="menu entries to measure (default: all chart pages)")
+    args = parser.parse_args()
+
+    pages = args.pages or ["Disaster Analytics"] + list(hazard_pages.HAZARDS)
+    print(f"{'page':<32}{'chart':>6}  {'type':<16}{'spec bytes':>12}{'data bytes':>12}")
+    total = 0
+    for page in pages:
+        for i, (kind, spec, data) in enumerate(page_payloads(page), 1):
+            print(f"{page:<32}{i:>6}  {kind:<16}{spec:>12}{data:>12}")
+            total += spec + data
+    print(f"total bytes: {total}")
+
+
+if __name__ == "__main__":
+    main()
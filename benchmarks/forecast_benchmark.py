@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import forecasting
+
+# Compares the closed-form forecasters with the per-series ARIMA fit on Main.csv. The last `steps` years of every series are held out, each method forecasts them from the years before, and the script reports throughput (series per second) and the mean absolute / root mean squared error of the held-out years. ARIMA is slow, so by default it only runs on an evenly spaced sample of series; the fast methods are scored on the same sample and on all series.
+
+
+def score(forecasts, actual):
+    error = forecasts - actual
+    return np.abs(error).mean(), np.sqrt((error ** 2).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forecasting backends on Main.csv.")
+    parser.add_argument("--steps", type=int, default=forecasting.STEPS, help="held-out years")
+    parser.add_argument("--arima-sample", type=int, default=100, help="series fitted with ARIMA (0 for all)")
+    args = parser.parse_args()
+
+    series = forecasting.all_series()
+    values = np.array([values for _, _, values, _ in series])
+    start_year = series[0][3]
+    train, actual = values[:, :-args.steps], values[:, -args.steps:]
+
+    n_sample = args.arima_sample or len(values)
+    sample = np.linspace(0, len(values) - 1, min(n_sample, len(values))).astype(int)
+
+    print(f"{len(values)} series, {train.shape[1]} training years, {args.steps} held out, ARIMA sample {len(sample)}")
+    print(f"{'method':<24}{'series/s':>12}{'MAE sample':>12}{'RMSE sample':>13}{'MAE all':>10}{'RMSE all':>10}")
+
+    start = time.perf_counter()
+    arima = np.array([
+        forecasting.fit_and_forecast_arima(train[i], start_year, steps=args.steps) for i in sample
+    ])
+    elapsed = time.perf_counter() - start
+    mae, rmse = score(arima, actual[sample])
+    print(f"{'ARIMA' + str(forecasting.ORDER):<24}{len(sample) / elapsed:>12.1f}{mae:>12.3f}{rmse:>13.3f}{'-':>10}{'-':>10}")
+
+    for name, method in forecasting.METHODS.items():
+        if method is None:
+            continue
+        start = time.perf_counter()
+        forecasts = method(train, args.steps)
+        elapsed = time.perf_counter() - start
+        mae, rmse = score(forecasts[sample], actual[sample])
+        mae_all, rmse_all = score(forecasts, actual)
+        print(f"{name:<24}{len(values) / elapsed:>12.1f}{mae:>12.3f}{rmse:>13.3f}{mae_all:>10.3f}{rmse_all:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
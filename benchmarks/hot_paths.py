@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_store
+import aggregates
+import charts
+import sparse_counts
+import forecasting
+
+# Benchmark suite for the data and chart paths behind the pages: CSV load, the melt-and-filter the pages used to run per chart next to the long table that replaced it, the groupby sums next to the aggregate cube and the sparse count store, the per-year percentages, choropleth construction and the ARIMA fit. Each benchmark runs on a synthetic copy of Main.csv scaled up 10x-1000x: a scale of s multiplies the number of countries by about sqrt(s) and the number of years and disaster types by about s**0.25 each, so the number of counts grows s-fold. Setup (clearing caches, building inputs) is not timed.
+#
+# Save a run with --save and compare a later one with --compare; benchmarks that got slower than --threshold times the saved median are reported and the script exits with status 1, so it can guard against regressions.
+
+TOTAL = 'TOTAL'
+
+
+# Writes Main.csv and Original.csv for the given scale into `directory`. Countries are copies of the real ones ("India 2", ...) and reuse their ISO-3 codes, so the maps have something to draw; the extra disaster types are numbered copies of the real ones.
+
+def synthetic_data(directory, scale, seed=0):
+    rng = np.random.default_rng(seed)
+    main = pd.read_csv(os.path.join(ROOT, "data", "Main.csv"))
+    original = pd.read_csv(os.path.join(ROOT, "data", "Original.csv"), usecols=['Country', 'ISO3'])
+    codes = dict(zip(original['Country'], original['ISO3']))
+
+    base_countries = sorted(main['Country'].unique())
+    base_hazards = sorted(set(main['Indicator']) - {TOTAL})
+    base_years = data_store.year_columns(main)
+
+    copies = max(1, round(scale ** 0.5))
+    countries = [c if k == 0 else f"{c} {k + 1}" for k in range(copies) for c in base_countries]
+    hazards = [h if k == 0 else f"{h} {k + 1}" for k in range(max(1, round(scale ** 0.25))) for h in base_hazards]
+    last_year = int(base_years[-1])
+    years = [str(year) for year in range(last_year - round(len(base_years) * scale ** 0.25) + 1, last_year + 1)]
+
+    # One row per (country, disaster type) with a Poisson count per year around a per-row rate, like the skewed real counts.
+    n = len(countries) * len(hazards)
+    rates = rng.gamma(0.5, 2.0, size=(n, 1))
+    counts = rng.poisson(rates, size=(n, len(years))).astype(np.float64)
+    rows = pd.DataFrame(counts, columns=years)
+    rows.insert(0, 'Country', np.repeat(countries, len(hazards)))
+    rows.insert(1, 'Indicator', np.tile(hazards, len(countries)))
+
+    totals = rows.groupby('Country', sort=False)[years].sum().reset_index()
+    totals.insert(1, 'Indicator', TOTAL)
+    table = pd.concat([rows, totals]).sort_values(['Country', 'Indicator'], kind='stable').reset_index(drop=True)
+    table['Total'] = table[years].sum(axis=1)
+    table.insert(0, 'ObjectId', np.arange(1, len(table) + 1))
+    table.to_csv(os.path.join(directory, "Main.csv"), index=False)
+
+    base = [c.rsplit(' ', 1)[0] if c not in codes else c for c in countries]
+    pd.DataFrame({'Country': countries, 'ISO3': [codes.get(c) for c in base]}).to_csv(os.path.join(directory, "Original.csv"), index=False)
+    return table
+
+
+def fresh():
+    data_store.clear_cache()
+    charts.chart_cache.clear()
+
+
+def fresh_main():
+    fresh()
+    return data_store.load_main()
+
+
+# name -> (setup, run). setup() returns the argument passed to run().
+
+def benchmarks(arima_series):
+
+    def melt_filter(main):
+        years = data_store.year_columns(main)
+        melted = main.melt(id_vars=['Country', 'Indicator'], value_vars=years, var_name='Year', value_name='Count')
+        return melted[(melted['Country'] == 'India') & (melted['Indicator'] == 'Flood')]
+
+    def groupby_sums(main):
+        years = data_store.year_columns(main)
+        return main[main['Indicator'] != TOTAL].groupby('Indicator')[years].sum()
+
+    def year_percentages(main):
+        years = data_store.year_columns(main)
+        rows = main[main['Indicator'] == 'Flood']
+        return rows[years].sum() / rows['Total'].sum() * 100
+
+    def arima_setup():
+        fresh()
+        series = forecasting.all_series()
+        picks = np.linspace(0, len(series) - 1, min(arima_series, len(series))).astype(int)
+        return [series[i] for i in picks]
+
+    def arima_fit(series):
+        for _, _, values, start_year in series:
+            forecasting.fit_and_forecast_arima(values, start_year)
+
+    return {
+        "csv load": (fresh, lambda _: data_store.load_main()),
+        "melt + filter (pandas)": (fresh_main, melt_filter),
+        "long table build": (fresh_main, lambda _: data_store.long_table()),
+        "long table slice": (lambda: data_store.long_table(), lambda table: table.series('India', 'Flood')),
+        "groupby sums (pandas)": (fresh_main, groupby_sums),
+        "aggregate cube build": (fresh_main, lambda _: aggregates.cube()),
+        "sparse store build": (fresh_main, lambda _: sparse_counts.sparse_counts()),
+        "sparse country sums + top-k": (sparse_counts.sparse_counts, lambda counts: counts.top_countries(10, 'Flood')),
+        "year percentages (pandas)": (fresh_main, year_percentages),
+        "year percentages (cube)": (aggregates.cube, lambda cube: cube.year_shares('Flood')),
+        "choropleth": (lambda: (fresh_main(), aggregates.cube(), data_store.iso3_codes()), lambda _: charts.choropleth('Flood', scope='world')),
+        f"ARIMA fit x{arima_series}": (arima_setup, arima_fit),
+    }
+
+
+def measure(setup, run, repeats):
+    run(setup())
+    times = []
+    for _ in range(repeats):
+        argument = setup()
+        start = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data and chart paths on synthetic data.")
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated scale factors, e.g. 10,100,1000")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--arima-series", type=int, default=10, help="series fitted per ARIMA repeat")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<28}{'scale':>7}{'rows':>9}{'median ms':>12}{'min ms':>10}{'vs saved':>10}")
+    for scale in [int(s) for s in args.scales.split(',')]:
+        with tempfile.TemporaryDirectory() as directory:
+            table = synthetic_data(directory, scale)
+            data_store.DATA_DIR = directory
+            for name, (setup, run) in benchmarks(args.arima_series).items():
+                if args.only and args.only not in name:
+                    continue
+                times = measure(setup, run, args.repeats)
+                key = f"{name} @{scale}"
+                results[key] = {"median": statistics.median(times), "min": min(times), "rows": len(table)}
+
+                ratio = ""
+                if key in baseline:
+                    slowdown = results[key]["median"] / baseline[key]["median"]
+                    ratio = f"{slowdown:.2f}x"
+                    if slowdown > args.threshold:
+                        regressions.append((key, slowdown))
+                print(f"{name:<28}{scale:>7}{len(table):>9}{results[key]['median'] * 1000:>12.2f}{results[key]['min'] * 1000:>10.2f}{ratio:>10}")
+            fresh()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print("\nSlower than %.2fx the saved run:" % args.threshold)
+        for key, slowdown in regressions:
+            print(f"  {key}: {slowdown:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+import statistics
+
+# Load test for the dashboard. Streamlit's AppTest stands in for the browser: every simulated session is an AppTest instance running the real streamlit_app.py script, driven from its own thread the way the Streamlit server runs one script thread per session. Each session opens the menu pages in random order, changes the country selectboxes and the multiselect, and presses "Get Prediction", and every rerun is timed. The report gives p50/p95/p99 rerun latency, reruns per second across all sessions and the resident memory added per session.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Measure the pages as they are, without the cache warm-up thread (see warmup.py) running alongside.
+os.environ.setdefault("WARMUP", "0")
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Session:
+
+    def __init__(self, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.random = random.Random(seed)
+        self.app = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=timeout)
+        self.latencies = []
+        self.errors = 0
+
+    def _run(self, action=None):
+        start = time.perf_counter()
+        (action or self.app).run()
+        self.latencies.append(time.perf_counter() - start)
+        self.errors += len(self.app.exception)
+
+    def _choose(self, widget):
+        return self.random.choice(list(widget.options))
+
+    def open(self):
+        self._run()
+
+    # One step of the scenario: open a random page, then use its widgets.
+
+    def step(self):
+        menu = self.app.sidebar.selectbox[0]
+        page = self._choose(menu)
+        self._run(menu.select(page))
+
+        if page == "Disaster Analytics":
+            for key in ("chart1", "country_select"):
+                box = self.app.selectbox(key=key)
+                self._run(box.select(self._choose(box)))
+        elif page == "Future Prediction":
+            country, disaster = self.app.main.selectbox[0], self.app.main.selectbox[1]
+            country.select(self._choose(country))
+            disaster.select(self._choose(disaster))
+            self._run(self.app.button[0].click())
+        elif page == "Biggest Changes":
+            ranking = self.app.main.radio[0]
+            self._run(ranking.set_value(self._choose(ranking)))
+            series = self.app.main.selectbox[0]
+            self._run(series.select(self._choose(series)))
+        else:
+            box = self.app.selectbox(key="chart2")
+            self._run(box.select(self._choose(box)))
+            picker = self.app.multiselect[0]
+            self._run(picker.set_value(self.random.sample(list(picker.options), 3)))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions and report rerun latency.")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--steps", type=int, default=5, help="pages each session opens")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per rerun")
+    args = parser.parse_args()
+
+    # The first session pays for the imports and the process-wide caches; the memory of the others is what each additional session costs.
+    sessions = [Session(args.seed + i, args.timeout) for i in range(args.sessions)]
+    sessions[0].open()
+    baseline = rss_bytes()
+    for session in sessions[1:]:
+        session.open()
+    per_session = (rss_bytes() - baseline) / max(1, args.sessions - 1)
+
+    def drive(session):
+        for _ in range(args.steps):
+            session.step()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for session in sessions for latency in session.latencies[1:]]
+    errors = sum(session.errors for session in sessions)
+    print(f"sessions: {args.sessions}, reruns: {len(latencies)}, errors: {errors}")
+    print(f"rerun latency p50 {percentile(latencies, 50) * 1000:.0f} ms, p95 {percentile(latencies, 95) * 1000:.0f} ms, p99 {percentile(latencies, 99) * 1000:.0f} ms, mean {statistics.mean(latencies) * 1000:.0f} ms")
+    print(f"throughput: {len(latencies) / elapsed:.1f} reruns/s over {elapsed:.1f}s")
+    print(f"memory: {per_session / 2 ** 20:.1f} MiB resident per additional session, {rss_bytes() / 2 ** 20:.0f} MiB total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+# Measures the cold import cost of the dashboard and of each heavy dependency. Every import runs in a fresh interpreter, so nothing is shared through sys.modules, and the script also lists which heavy modules importing streamlit_app pulls in: plotly.express and statsmodels should only appear once a page that needs them runs.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "numpy",
+    "pandas",
+    "altair",
+    "streamlit",
+    "plotly.express",
+    "statsmodels.tsa.arima.model",
+    "data_store",
+    "aggregates",
+    "charts",
+    "forecasting",
+    "streamlit_app",
+]
+
+HEAVY = ["plotly.express", "statsmodels", "matplotlib", "scipy"]
+
+TIMER = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def import_seconds(module, repeat):
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def loaded_by_app():
+    code = "import sys, streamlit_app; print(' '.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    loaded = set(result.stdout.split())
+    return [name for name in HEAVY if name in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the cold import time of the dashboard modules.")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module (median is reported)")
+    args = parser.parse_args()
+
+    print(f"{'module':<32}{'cold import (s)':>16}")
+    for module in MODULES:
+        print(f"{module:<32}{import_seconds(module, args.repeat):>16.3f}")
+
+    heavy = loaded_by_app()
+    print("heavy modules loaded by 'import streamlit_app':", ", ".join(heavy) if heavy else "none")
+
+
+if __name__ == "__main__":
+    main()
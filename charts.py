@@ -0,0 +1,121 @@
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import data_store
+import aggregates
+
+# Figures shared by every session. Building a choropleth means resolving every country name to its geometry and validating the whole figure, which dominated the hazard pages even when the user only touched an unrelated selectbox. The figures depend only on the data, so they are built once per version of Main.csv (and, for the maps, of Original.csv, which provides the ISO-3 codes) and the same object is handed to st.plotly_chart on every rerun. plotly.express is imported inside the builders so that only pages that draw a Plotly figure pay for importing it.
+
+
+# World map of the total occurrences of one indicator per country ('TOTAL' for all disasters). Countries are located by ISO-3 code and named in the hover label; countries without a code are left out (data_store.iso3_codes logs them). Extra keyword arguments go to px.choropleth and are part of the cache key.
+
+def choropleth(indicator, color='Total', **options):
+    key = ("choropleth", indicator, color, tuple(sorted(options.items())), data_store.version("Original.csv"))
+
+    def build(main):
+        import plotly.express as px
+
+        map_data = aggregates.cube().country_totals(indicator)
+        map_data['ISO3'] = map_data['Country'].map(data_store.iso3_codes())
+        map_data = map_data.dropna(subset=['ISO3'])
+        return px.choropleth(map_data, locations='ISO3', locationmode='ISO-3', hover_name='Country', color=color, **options)
+
+    return data_store.derived("Main.csv", key, build)
+
+
+# Pie chart of each year's share of one indicator's total occurrences.
+
+def year_share_pie(indicator):
+    def build(main):
+        import plotly.express as px
+
+        return px.pie(aggregates.cube().year_shares(indicator), values="Percentage", names="Year")
+
+    return data_store.derived("Main.csv", ("year_share_pie", indicator), build)
+
+
+# Server-side reduction of chart data. Streamlit ships every column of an Altair chart's frame to the browser, including the full category list of categorical columns, so charts are handed only the columns their encodings use, with unused categories dropped and the index reset. Any filtering or aggregation has already happened in pandas/NumPy by this point.
+
+def chart_data(frame, *fields):
+    data = frame[list(fields)].reset_index(drop=True)
+    for field in fields:
+        if isinstance(data[field].dtype, pd.CategoricalDtype):
+            data[field] = data[field].cat.remove_unused_categories()
+    return data
+
+
+# Bounded least-recently-used cache for chart data and Altair charts that depend on a user selection (a country, a set of countries). There can be many such selections, so unlike the per-version figures above the cache is capped both by entry count and by the estimated size of what it holds, which keeps its memory predictable however many sessions and selections there are.
+
+def _size(value):
+    data = getattr(value, 'data', value)
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(deep=True).sum()) + 1024
+    return len(json.dumps(value, default=str))
+
+
+class LRUCache:
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = build()
+        size = _size(value)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+        return value
+
+    # Moves the entries cached under version `old` to version `new` when keep(key) says they are still valid for it (key without the version), and drops the rest of `old`.
+
+    def carry_over(self, old, new, keep):
+        with self._lock:
+            kept = 0
+            for key in list(self._entries):
+                if key[0] != old:
+                    continue
+                value, size = self._entries.pop(key)
+                if keep(key[1:]):
+                    self._entries[(new,) + key[1:]] = (value, size)
+                    kept += 1
+                else:
+                    self.bytes -= size
+            return kept
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+chart_cache = LRUCache()
+
+
+# Memoizes build() in chart_cache under the current version of Main.csv and `key`.
+
+def cached(key, build):
+    return chart_cache.get((data_store.version("Main.csv"),) + tuple(key), build)
@@ -0,0 +1,134 @@
+import os
+import json
+import glob
+import time
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Binary columnar copies of the CSV datasets. Parsing CSV text costs time on every load and leaves the counts as float64 ("0.0"), so this step converts data/<name>.csv into a directory data/<name>.cols holding one .npy file per column and a schema.json describing them:
+#   - whole-number columns without gaps are stored in the smallest integer type (int16 or wider) that fits them,
+#   - text columns are dictionary encoded (integer codes + the category list in the schema) and load as pandas categoricals,
+#   - anything else keeps its dtype.
+# The columns are memory-mapped on load, so they are paged in lazily and shared between processes that read the same files. data_store.load() uses a store automatically while it matches the CSV it was converted from.
+#
+# A store is never modified in place: rewriting a file that another frame has mapped would change that frame's codes under its old category list (or raise SIGBUS if the file shrinks). Every write puts the columns into new files named after a fresh generation, swaps in the schema that points at them last and then removes the files of earlier generations (those still mapped on Windows stay until a later write); frames mapped from those keep reading the old data until they are dropped.
+
+SCHEMA = "schema.json"
+FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def store_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".cols"
+
+
+# Counts start at int16 so that ordinary arithmetic on them does not overflow; category codes may use int8.
+
+def _integer_dtype(values, smallest=np.int16):
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.dtype(dtype).itemsize < np.dtype(smallest).itemsize:
+            continue
+        info = np.iinfo(dtype)
+        if values.min(initial=0) >= info.min and values.max(initial=0) <= info.max:
+            return dtype
+    return np.int64
+
+
+def _encode(series):
+    values = series.to_numpy()
+    if series.dtype.kind in "iu":
+        return values.astype(_integer_dtype(values)), None
+    if series.dtype.kind == "f":
+        if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+            return values.astype(_integer_dtype(values)), None
+        return values, None
+
+    categorical = pd.Categorical(series)
+    codes = categorical.codes
+    return codes.astype(_integer_dtype(codes, np.int8)), [str(category) for category in categorical.categories]
+
+
+def write_store(frame, path, source_mtime_ns=None):
+    os.makedirs(path, exist_ok=True)
+    generation = "%x" % time.time_ns()
+    columns = []
+    for i, column in enumerate(frame.columns):
+        values, categories = _encode(frame[column])
+        file_name = "%03d-%s.npy" % (i, generation)
+        np.save(os.path.join(path, file_name), np.ascontiguousarray(values))
+        columns.append({
+            "name": column,
+            "file": file_name,
+            "dtype": values.dtype.str,
+            "categories": categories,
+        })
+
+    schema = {
+        "format_version": FORMAT_VERSION,
+        "rows": len(frame),
+        "source_mtime_ns": source_mtime_ns,
+        "columns": columns,
+    }
+    # The schema is written last, so a half-written store is never picked up.
+    tmp = os.path.join(path, SCHEMA + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(schema, f, indent=1)
+    os.replace(tmp, os.path.join(path, SCHEMA))
+
+    # On Windows a file that a running app still has mapped cannot be removed; it is left for a later write to clean up.
+    current = {column["file"] for column in columns}
+    for old in glob.glob(os.path.join(path, "*.npy")):
+        if os.path.basename(old) not in current:
+            try:
+                os.remove(old)
+            except OSError as error:
+                logger.debug("Keeping %s for now: %s", old, error)
+
+
+def read_schema(path):
+    try:
+        with open(os.path.join(path, SCHEMA)) as f:
+            schema = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return schema if schema.get("format_version") == FORMAT_VERSION else None
+
+
+def read_store(path, schema=None):
+    schema = schema or read_schema(path)
+    data = {}
+    for column in schema["columns"]:
+        values = np.load(os.path.join(path, column["file"]), mmap_mode="r")
+        if column["categories"] is not None:
+            values = pd.Categorical.from_codes(values, column["categories"])
+        data[column["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def convert(csv_path):
+    start = time.perf_counter()
+    frame = pd.read_csv(csv_path)
+    write_store(frame, store_path(csv_path), os.stat(csv_path).st_mtime_ns)
+    csv_bytes = os.path.getsize(csv_path)
+    store_bytes = sum(os.path.getsize(f) for f in glob.glob(os.path.join(store_path(csv_path), "*")))
+    logger.info("%s -> %s: %d rows, %d -> %d bytes in %.3fs", os.path.basename(csv_path), os.path.basename(store_path(csv_path)), len(frame), csv_bytes, store_bytes, time.perf_counter() - start)
+
+
+def main():
+    import data_store
+
+    parser = argparse.ArgumentParser(description="Convert the CSV datasets into memory-mapped columnar stores.")
+    parser.add_argument("files", nargs="*", help="CSV files to convert (default: data/*.csv)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    for csv_path in args.files or sorted(glob.glob(os.path.join(data_store.DATA_DIR, "*.csv"))):
+        convert(csv_path)
+
+
+if __name__ == "__main__":
+    main()
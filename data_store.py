@@ -0,0 +1,295 @@
+import os
+import time
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+import columnar
+
+# Shared data-access layer for the dashboard. Streamlit re-runs the page script on every widget interaction and for every session, so instead of calling pd.read_csv inside the page functions each dataset is parsed once per process and the same frame is handed to every session. A file is re-read only when its modification time changes on disk, and hit/miss counts and load times are kept so the cost of the cache can be inspected.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+logger = logging.getLogger(__name__)
+
+# With copy-on-write enabled a shallow copy shares memory with the cached frame, but any modification made by a page goes to its own copy and never reaches the other sessions.
+# pandas >= 3.0 always behaves this way; on 2.x it has to be switched on.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+_lock = threading.RLock()
+_cache = {}
+_stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+class _Entry:
+
+    def __init__(self, frame, mtime, load_seconds):
+        self.frame = frame
+        self.mtime = mtime
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.hits = 0
+        self.derived = {}
+        self.building = {}
+
+
+def _path(name):
+    return name if os.path.isabs(name) else os.path.join(DATA_DIR, name)
+
+
+# Modification stamp of a dataset: the CSV's mtime, plus the schema mtime of its columnar store (see columnar.py) when one exists, so converting a file also counts as a change.
+
+def _mtime(path):
+    schema = os.path.join(columnar.store_path(path), columnar.SCHEMA)
+    stamps = tuple(os.stat(p).st_mtime_ns for p in (path, schema) if os.path.exists(p))
+    if not stamps:
+        raise FileNotFoundError(path)
+    return stamps
+
+
+# Reads a dataset from its memory-mapped columnar store while that store was converted from the current CSV, otherwise parses the CSV.
+
+def _read(path):
+    start = time.perf_counter()
+    store = columnar.store_path(path)
+    schema = columnar.read_schema(store)
+    if schema is not None and (not os.path.exists(path) or schema["source_mtime_ns"] == os.stat(path).st_mtime_ns):
+        try:
+            frame = columnar.read_store(store, schema)
+        except FileNotFoundError:
+            # The store was rewritten between reading its schema and its columns; the new schema points at the new files.
+            frame = columnar.read_store(store)
+    else:
+        if schema is not None:
+            logger.warning("%s is older than %s, reading the CSV", os.path.basename(store), os.path.basename(path))
+        frame = pd.read_csv(path)
+    return frame, time.perf_counter() - start
+
+
+# Returns the parsed contents of data/<name> as a read-only frame shared by every session. The file is parsed on the first call and again only after its mtime changes.
+
+def load(name):
+    return _entry(name).frame.copy(deep=False)
+
+
+def _entry(name):
+    path = _path(name)
+    mtime = _mtime(path)
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and entry.mtime == mtime:
+            entry.hits += 1
+            _stats["hits"] += 1
+            return entry
+
+        frame, elapsed = _read(path)
+        old, entry = entry, _Entry(frame, mtime, elapsed)
+        if old is None:
+            _stats["misses"] += 1
+        else:
+            _stats["reloads"] += 1
+            logger.info("%s changed on disk, reloaded", name)
+            keep = _recorded_change(path, old.mtime, mtime)
+            if keep is not None:
+                _carry_over(name, old, entry, keep)
+        _cache[path] = entry
+        logger.info("Loaded %s (%d rows) in %.3fs", name, len(frame), elapsed)
+        return entry
+
+
+# A change made by incremental.update (possibly in another process, e.g. "python incremental.py delta.csv" while the server runs) leaves a record next to the file. When a reload is exactly the transition it records, the values derived from the old version are carried over the way update() does in its own process instead of all being dropped.
+
+CHANGE_SUFFIX = ".delta.json"
+
+
+def _recorded_change(path, old_mtime, new_mtime):
+    if not os.path.exists(path + CHANGE_SUFFIX):
+        return None
+    import incremental
+    return incremental.recorded_carry_over(path, old_mtime, new_mtime)
+
+
+def _carry_over(name, old, entry, keep):
+    for key, value in old.derived.items():
+        kept = keep(key, value)
+        if kept is not None:
+            entry.derived[key] = kept
+    logger.info("Refreshed %s, kept %d of %d derived values", name, len(entry.derived), len(old.derived))
+
+
+def load_main():
+    return load("Main.csv")
+
+
+def load_original():
+    return load("Original.csv")
+
+
+# The per-year count columns of a wide table ("2001" ... "2021"), in file order.
+
+def year_columns(frame):
+    return [column for column in frame.columns if column.isdigit()]
+
+
+# Version token of a cached dataset, changes every time the file is reloaded. Anything derived from a dataset can be keyed on it.
+
+def version(name):
+    return (os.path.basename(_path(name)), _entry(name).mtime)
+
+
+# Re-reads a dataset that was just rewritten in this process and decides, for every value derived from the old version, whether it survives: keep(key, value) returns the value to carry over (possibly patched) or None to drop it and let it be rebuilt on demand. Used by incremental.py so that a small update does not throw away every cached table, chart and forecast.
+
+def refresh(name, keep):
+    path = _path(name)
+    with _lock:
+        old = _cache.get(path)
+        frame, elapsed = _read(path)
+        entry = _Entry(frame, _mtime(path), elapsed)
+        if old is not None:
+            _carry_over(name, old, entry, keep)
+        _cache[path] = entry
+        _stats["reloads"] += 1
+        return frame.copy(deep=False)
+
+
+# Memoizes build(frame) against the current version of a dataset. The value is dropped together with the cached frame when the file is reloaded, so derived tables can never be staler than their source.
+#
+# The build runs outside the process-wide lock, so loads and cache hits of other sessions do not wait for it; a per-key lock makes concurrent callers of the same key wait for the one build instead of repeating it. The value is stored on the entry whose frame it was built from, so a build that overlaps a reload never lands on the newer version.
+
+def derived(name, key, build):
+    entry = _entry(name)
+    with _lock:
+        if key in entry.derived:
+            return entry.derived[key]
+        guard = entry.building.setdefault(key, threading.Lock())
+
+    with guard:
+        with _lock:
+            if key in entry.derived:
+                return entry.derived[key]
+        start = time.perf_counter()
+        value = build(entry.frame.copy(deep=False))
+        logger.info("Built %s from %s in %.3fs", key, name, time.perf_counter() - start)
+        with _lock:
+            entry.derived[key] = value
+            entry.building.pop(key, None)
+        return value
+
+
+# Main.csv is the only table the hazard pages need: each hazard dataset is just its rows for one indicator. It is kept once in memory as a wide table indexed by (Indicator, Country), in the original row order within each indicator.
+
+HAZARDS = ("Drought", "Extreme temperature", "Flood", "Landslide", "Storm", "Wildfire")
+
+
+def wide_table():
+    return derived("Main.csv", "wide", lambda main: main.set_index(['Indicator', 'Country']).sort_index(level='Indicator', sort_remaining=False))
+
+
+# Rows of one indicator, laid out like the per-hazard CSVs used to be (ObjectId, Country, Indicator, years..., Total). The slice shares memory with the wide table.
+
+def hazard(indicator):
+
+    def build(main):
+        rows = wide_table().xs(indicator, level='Indicator', drop_level=False)
+        return rows.reset_index()[main.columns]
+
+    return derived("Main.csv", ("hazard", indicator), build).copy(deep=False)
+
+
+# Long (Country, Indicator, Year, Count) form of Main.csv, built once instead of a pd.melt per chart. Rows are sorted by country, indicator and year, so the rows of one country, or of one country and indicator, are a contiguous block and a selection is an iloc slice. Country and Indicator are categoricals, Year is int16 and Count is int32 whenever the counts are whole numbers.
+
+class LongTable:
+
+    def __init__(self, main):
+        years = year_columns(main)
+        rows = main.sort_values(['Country', 'Indicator'], kind='stable')
+        counts = rows[years].to_numpy()
+        n_rows, n_years = counts.shape
+        if np.array_equal(counts, np.round(counts)) and np.abs(counts).max(initial=0) < 2 ** 31:
+            counts = counts.astype(np.int32)
+
+        countries = pd.Categorical(rows['Country'])
+        indicators = pd.Categorical(rows['Indicator'])
+        self.frame = pd.DataFrame({
+            'Country': countries.take(np.repeat(np.arange(n_rows), n_years)),
+            'Indicator': indicators.take(np.repeat(np.arange(n_rows), n_years)),
+            'Year': np.tile(np.array(years, dtype=np.int16), n_rows),
+            'Count': counts.ravel(),
+        })
+
+        self._country = {}
+        self._series = {}
+        for i, (country, indicator) in enumerate(zip(rows['Country'], rows['Indicator'])):
+            start, stop = i * n_years, (i + 1) * n_years
+            self._series[(country, indicator)] = (start, stop)
+            first = self._country.get(country, (start, stop))[0]
+            self._country[country] = (first, stop)
+
+    def _slice(self, bounds):
+        start, stop = bounds if bounds is not None else (0, 0)
+        return self.frame.iloc[start:stop]
+
+    # All years of every indicator for one country.
+
+    def country(self, country):
+        return self._slice(self._country.get(country))
+
+    # All years of one indicator for one country; empty if the country has no row for it.
+
+    def series(self, country, indicator):
+        return self._slice(self._series.get((country, indicator)))
+
+    def countries(self, countries, indicator):
+        parts = [self.series(country, indicator) for country in countries]
+        return pd.concat(parts) if parts else self._slice(None)
+
+
+def long_table():
+    return derived("Main.csv", "long", LongTable)
+
+
+# Country name -> ISO-3 code, taken from the ISO3 column of Original.csv. The maps locate countries by these codes instead of letting Plotly match names like "Afghanistan, Islamic Rep. of", which it silently drops when it cannot. The index is rebuilt when either dataset changes, and every build logs the countries of Main.csv it has no code for, so a name that cannot be drawn is reported as soon as the data is loaded.
+
+def iso3_codes():
+    original = version("Original.csv")
+
+    def build(main):
+        codes = load_original().dropna(subset=['ISO3']).drop_duplicates('Country')
+        codes = dict(zip(codes['Country'], codes['ISO3']))
+        unmatched = sorted(set(main['Country']) - set(codes))
+        if unmatched:
+            logger.warning("No ISO-3 code for %d countries: %s", len(unmatched), ", ".join(unmatched))
+        return codes
+
+    return derived("Main.csv", ("iso3", original), build)
+
+
+# Countries of Main.csv without an ISO-3 code; these cannot be drawn on the maps.
+
+def unmatched_countries():
+    return sorted(set(load_main()['Country']) - set(iso3_codes()))
+
+
+def cache_stats():
+    with _lock:
+        files = {
+            os.path.basename(path): {
+                "rows": len(entry.frame),
+                "hits": entry.hits,
+                "load_seconds": round(entry.load_seconds, 4),
+                "derived": len(entry.derived),
+                "loaded_at": entry.loaded_at,
+            }
+            for path, entry in _cache.items()
+        }
+        return {**_stats, "files": files}
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _stats.update(hits=0, misses=0, reloads=0)
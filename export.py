@@ -0,0 +1,319 @@
+import os
+import re
+import sys
+import json
+import html
+import time
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+import pandas as pd
+
+import data_store
+import aggregates
+import charts
+import hazard_pages
+import similarity
+
+# Static export of the dashboard's charts for the per-country briefing. For every country it writes the charts of the Disaster Analytics page and of each disaster page that lists the country (count by year, similar countries) as Vega-Lite JSON, plus one HTML page showing them all; the maps, bubble charts and year-share pies, which are the same for every country, are written once to global/. Layout of the output directory:
+#
+#   index.html                       links to every country page and to global/
+#   global/index.html, *.json        the country-independent charts (Vega-Lite .vl.json, Plotly .plotly.json)
+#   countries/<country>/index.html   all charts of one country
+#   countries/<country>/*.vl.json
+#   manifest.json                    SHA-256 of every file written and of every country's inputs
+#
+# The shared aggregates and indexes are built once in the main process before the worker processes are forked, so the workers inherit them instead of rebuilding them. A file whose content hash matches the manifest of the previous export is not written again, and files of countries or charts that no longer exist are removed, so a re-export after a small data change only touches the outputs that changed. A country whose inputs (its rows of Main.csv, the rows of its similar countries and the chart code) hash to the same digest as in the previous export is not rendered at all.
+#
+#   python export.py [--output reports] [--workers N] [--country India ...]
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+MANIFEST = "manifest.json"
+TOTAL = 'TOTAL'
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.jsdelivr.net/npm/vega@{vega}"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-lite@{vega_lite}"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-embed@{vega_embed}"></script>
+<script src="https://cdn.plot.ly/plotly-{plotly}.min.js"></script>
+</head>
+<body>
+<h1>{title}</h1>
+{body}
+<script>
+{scripts}
+</script>
+</body>
+</html>
+"""
+
+
+def slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _vega_lite(chart):
+    return json.dumps(chart.to_dict(validate=False), sort_keys=True)
+
+
+def _plotly(figure):
+    return figure.to_json()
+
+
+# One HTML page embedding the given charts, each (heading, kind, spec) with kind "vl" or "plotly" and spec the JSON text.
+
+def render_page(title, sections, links=()):
+    from plotly.offline import get_plotlyjs_version
+
+    body, scripts = [], []
+    for number, (heading, kind, spec) in enumerate(sections):
+        body.append(f'<h2>{html.escape(heading)}</h2>\n<div id="chart-{number}"></div>')
+        spec = spec.replace('</', '<\\/')
+        if kind == "vl":
+            scripts.append(f'vegaEmbed("#chart-{number}", {spec});')
+        else:
+            scripts.append(f'(function (figure) {{ Plotly.newPlot("chart-{number}", figure.data, figure.layout); }})({spec});')
+    if links:
+        items = "\n".join(f'<li><a href="{html.escape(href)}">{html.escape(text)}</a></li>' for text, href in links)
+        body.append(f"<ul>\n{items}\n</ul>")
+    return PAGE.format(
+        title=html.escape(title),
+        vega=alt.VEGA_VERSION,
+        vega_lite=alt.VEGALITE_VERSION,
+        vega_embed=alt.VEGAEMBED_VERSION,
+        plotly=get_plotlyjs_version(),
+        body="\n".join(body),
+        scripts="\n".join(scripts),
+    )
+
+
+class Writer:
+
+    def __init__(self, out_dir, previous):
+        self.out_dir = out_dir
+        self.previous = previous
+        self.manifest = {}
+        self.written = 0
+        self.skipped = 0
+
+    # Writes `content` to out_dir/relative unless the previous export wrote the same content there.
+
+    def write(self, relative, content):
+        data = content.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        self.manifest[relative] = digest
+        path = os.path.join(self.out_dir, relative)
+        if self.previous.get(relative) == digest and os.path.exists(path):
+            self.skipped += 1
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".%d.tmp" % os.getpid()
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.written += 1
+
+
+def _hazard_countries():
+    return {hazard.indicator: set(data_store.hazard(hazard.indicator)['Country']) for hazard in hazard_pages.HAZARDS.values()}
+
+
+# Charts of one country: (file name, heading, chart).
+
+def country_charts(country, hazard_countries):
+    import streamlit_app
+
+    charts_ = [
+        ("total", "Total disasters", streamlit_app.country_total_chart(country)),
+        ("trend", "Trend of total disasters", streamlit_app.country_trend_chart(country)),
+        ("breakdown", "Number of disasters by type", streamlit_app.country_breakdown_chart(country)),
+    ]
+    for hazard in hazard_pages.HAZARDS.values():
+        if country not in hazard_countries[hazard.indicator]:
+            continue
+        name = slug(hazard.title)
+        charts_.append((f"{name}-count", f"{hazard.title} Count by Year", hazard_pages.country_chart(hazard, country)))
+        similar = similarity.similar(country, hazard.indicator)
+        if not similar.empty:
+            charts_.append((f"{name}-similar", f"Countries with a Similar {hazard.title} Profile", hazard_pages.similar_chart(hazard, country, similar['Country'].tolist())))
+    return charts_
+
+
+# Digest of everything the charts of one country are drawn from.
+
+def _country_inputs(country, hazard_countries, code):
+    digest = hashlib.sha256(code.encode())
+    long_table = data_store.long_table()
+    parts = [long_table.country(country)]
+    for hazard in hazard_pages.HAZARDS.values():
+        if country not in hazard_countries[hazard.indicator]:
+            continue
+        similar = similarity.similar(country, hazard.indicator)['Country'].tolist()
+        digest.update(repr((hazard.indicator, similar)).encode())
+        parts.append(long_table.countries(similar, hazard.indicator))
+    for part in parts:
+        digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _export_country(task):
+    country, out_dir, previous, previous_inputs, hazard_countries, code = task
+    inputs = _country_inputs(country, hazard_countries, code)
+    if inputs == previous_inputs and previous and all(os.path.exists(os.path.join(out_dir, path)) for path in previous):
+        return previous, inputs, 0, len(previous)
+
+    writer = Writer(out_dir, previous)
+    folder = f"countries/{slug(country)}"
+    sections = []
+    for name, heading, chart in country_charts(country, hazard_countries):
+        spec = _vega_lite(chart)
+        writer.write(f"{folder}/{name}.vl.json", spec)
+        sections.append((heading, "vl", spec))
+    writer.write(f"{folder}/index.html", render_page(country, sections, [("All countries", "../../index.html")]))
+    return writer.manifest, inputs, writer.written, writer.skipped
+
+
+def _export_global(writer):
+    cube = aggregates.cube()
+    sections = []
+
+    def add(name, heading, kind, spec):
+        writer.write(f"global/{name}.{'vl' if kind == 'vl' else 'plotly'}.json", spec)
+        sections.append((heading, kind, spec))
+
+    add("total-map", "Total occurrences of disasters by country", "plotly",
+        _plotly(charts.choropleth(TOTAL, range_color=(0, cube.country_totals(TOTAL)['Total'].max()), width=800, height=600)))
+    for hazard in hazard_pages.HAZARDS.values():
+        name = slug(hazard.title)
+        add(f"{name}-map", f"Geographical Distribution of {hazard.title} Occurrences", "plotly", _plotly(charts.choropleth(hazard.indicator, scope='world')))
+        add(f"{name}-by-country", f"Total Number of {hazard.plural} by Country", "vl", _vega_lite(hazard_pages.bubble_chart(hazard)))
+        add(f"{name}-year-share", f"Contribution of Each Year to the Total Number of {hazard.plural}", "plotly", _plotly(charts.year_share_pie(hazard.indicator)))
+    writer.write("global/index.html", render_page("All countries", sections, [("Countries", "../index.html")]))
+
+
+# Builds everything the workers share, so that forked workers inherit it.
+
+def _prepare():
+    aggregates.cube()
+    data_store.long_table()
+    data_store.iso3_codes()
+    for hazard in hazard_pages.HAZARDS.values():
+        data_store.hazard(hazard.indicator)
+        similarity.index(hazard.indicator)
+
+
+# Version of the code that draws the country charts; a change to it invalidates every country's inputs.
+
+def _code_version():
+    import streamlit_app
+    from plotly.offline import get_plotlyjs_version
+
+    digest = hashlib.sha256(repr((alt.__version__, get_plotlyjs_version())).encode())
+    for module in (streamlit_app, hazard_pages, charts, sys.modules[__name__]):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# Returns (files, inputs): relative path -> SHA-256 of every file of the previous export, and country -> digest of its inputs. Manifests written before the inputs were recorded are a flat map of files.
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}
+    if "files" in manifest:
+        return manifest["files"], manifest.get("inputs", {})
+    return manifest, {}
+
+
+# Exports the report for every country (or the given ones) and returns a summary.
+
+def export(out_dir=OUTPUT_DIR, workers=None, countries=None):
+    start = time.perf_counter()
+    previous, previous_inputs = _read_manifest(out_dir)
+    _prepare()
+    hazard_countries = _hazard_countries()
+    code = _code_version()
+    all_countries = sorted(data_store.load_main()['Country'].unique())
+    selected = all_countries if not countries else [country for country in all_countries if country in set(countries)]
+
+    writer = Writer(out_dir, previous)
+    _export_global(writer)
+    manifest, written, skipped = dict(writer.manifest), writer.written, writer.skipped
+
+    tasks = []
+    for country in selected:
+        prefix = f"countries/{slug(country)}/"
+        files = {path: digest for path, digest in previous.items() if path.startswith(prefix)}
+        tasks.append((country, out_dir, files, previous_inputs.get(country), hazard_countries, code))
+    inputs = {country: digest for country, digest in previous_inputs.items() if country not in selected and country in all_countries}
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for country, (part, part_inputs, part_written, part_skipped) in zip(selected, pool.map(_export_country, tasks, chunksize=4)):
+            manifest.update(part)
+            inputs[country] = part_inputs
+            written += part_written
+            skipped += part_skipped
+
+    links = [(country, f"countries/{slug(country)}/index.html") for country in all_countries]
+    writer = Writer(out_dir, previous)
+    writer.write("index.html", render_page("Disaster briefing", [], [("All countries (maps and totals)", "global/index.html")] + links))
+    manifest.update(writer.manifest)
+    written += writer.written
+    skipped += writer.skipped
+
+    # With a subset of countries the outputs of the other countries are kept; every other output that was not produced again is stale.
+    exported = {f"countries/{slug(country)}/" for country in selected}
+    removed = 0
+    for path in previous:
+        if path in manifest:
+            continue
+        if countries and path.startswith("countries/") and path[:path.index("/", 10) + 1] not in exported:
+            manifest[path] = previous[path]
+            continue
+        try:
+            os.remove(os.path.join(out_dir, path))
+            removed += 1
+        except OSError:
+            pass
+
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({"files": manifest, "inputs": inputs}, f, indent=1, sort_keys=True)
+
+    summary = {
+        "countries": len(selected),
+        "files": len(manifest),
+        "written": written,
+        "unchanged": skipped,
+        "removed": removed,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    logger.info("Export: %s", summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the dashboard's charts for every country as Vega-Lite/Plotly JSON and HTML.")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--country", action="append", help="export only this country (repeatable)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    print(export(args.output, args.workers, args.country))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import signal
+import hashlib
+import logging
+import argparse
+import warnings
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_store
+
+# Forecasts for the "Future Prediction" page. Fitting an ARIMA model takes long enough to stall the page, so results are kept in an on-disk cache keyed by the contents of the series and the model order: the page only fits a series the first time it is asked for (or after its data changed), and the batch mode at the bottom of this file fills the cache for every (Country, Indicator) series of Main.csv across a process pool. Instead of the fixed ORDER, the order of each series can be searched (select_order): the page runs the search in a background worker process, and the winner is cached like any other forecast.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".forecast_cache")
+ORDER = (1, 1, 1)
+STEPS = 5
+
+# Automatic order selection: candidate (p, d, q) orders, the longest a single fit may take, the time budget of one series' search, and the worker processes that run searches for the page.
+GRID = {"p": range(3), "d": range(2), "q": range(3)}
+CRITERIA = ("aic", "bic")
+FIT_TIMEOUT = 5.0
+SEARCH_BUDGET = 30.0
+BACKGROUND_WORKERS = 2
+AUTO_METHOD = "ARIMA (auto order)"
+
+logger = logging.getLogger(__name__)
+
+
+# Fits ARIMA on one annual series starting in start_year and returns the next `steps` values. Series the model cannot handle fall back to zeros, as the page always did.
+
+def fit_and_forecast_arima(values, start_year, order=ORDER, steps=STEPS):
+    try:
+        forecast_arima = _fit(_annual(values, start_year), order).forecast(steps=steps)
+        return [float(value) for value in forecast_arima]
+    except ValueError as error:
+        logger.warning("ARIMA%s failed (%s), forecasting zeros", tuple(order), error)
+        return [0.0] * steps
+
+
+def _annual(values, start_year):
+    index = pd.date_range(start=str(start_year), periods=len(values), freq='YS')
+    return pd.Series(np.asarray(values, dtype=np.float64), index=index)
+
+
+def _fit(series, order):
+    # statsmodels takes seconds to import, so it is only loaded once an ARIMA model is actually fitted.
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ARIMA(series, order=order).fit()
+
+
+class FitTimeout(Exception):
+    pass
+
+
+# Interrupts the body after `seconds` with FitTimeout. This needs SIGALRM and the main thread, which is where worker processes run their tasks; anywhere else the body runs without a limit.
+
+@contextmanager
+def _time_limit(seconds):
+    if seconds is None or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise FitTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# Number of differences d from the grid: the series is differenced while a KPSS test rejects stationarity at the 5% level. AIC and BIC of models with different d are computed on different data and cannot be compared, so d is fixed before the (p, q) search.
+
+def _differences(series, grid=GRID):
+    from statsmodels.tsa.stattools import kpss
+
+    values = series.to_numpy()
+    d = min(grid["d"])
+    for _ in range(d):
+        values = np.diff(values)
+    while d < max(grid["d"]) and len(values) > 3 and values.std() > 0:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                p_value = kpss(values, regression='c', nlags='auto')[1]
+        except (ValueError, OverflowError):
+            break
+        if p_value >= 0.05:
+            break
+        values = np.diff(values)
+        d += 1
+    return d
+
+
+# Candidate orders with d differences, grouped by p + q, simplest group first.
+
+def _order_levels(d, grid=GRID):
+    levels = {}
+    for p in grid["p"]:
+        for q in grid["q"]:
+            levels.setdefault(p + q, []).append((p, d, q))
+    return [levels[level] for level in sorted(levels)]
+
+
+# Searches the order grid for the model with the lowest AIC or BIC and forecasts with it. d is chosen first (see _differences), then (p, q) orders are tried from simple to complex, and the search stops early once a whole level of p + q brings no improvement or the time budget of the series runs out. Orders that fail or take longer than `timeout` seconds are skipped; if none fits, the forecast is zeros as with a fixed order.
+
+def select_order(values, start_year, steps=STEPS, criterion="aic", timeout=FIT_TIMEOUT, budget=SEARCH_BUDGET):
+    series = _annual(values, start_year)
+    start = time.perf_counter()
+    best, best_score, tried, failed = None, np.inf, 0, 0
+
+    for level in _order_levels(_differences(series)):
+        improved = False
+        for order in level:
+            if time.perf_counter() - start > budget:
+                break
+            tried += 1
+            try:
+                with _time_limit(timeout):
+                    fitted = _fit(series, order)
+                score = float(getattr(fitted, criterion))
+            except (ValueError, np.linalg.LinAlgError, FitTimeout):
+                failed += 1
+                continue
+            if np.isfinite(score) and score < best_score:
+                best, best_score, improved = (order, fitted), score, True
+        if time.perf_counter() - start > budget or (best is not None and not improved):
+            break
+
+    if best is None:
+        logger.warning("No ARIMA order could be fitted (%d tried), forecasting zeros", tried)
+        result = _result(start_year, len(values), None, [0.0] * steps)
+    else:
+        order, fitted = best
+        result = _result(start_year, len(values), order, [float(value) for value in fitted.forecast(steps=steps)])
+        result["criterion"] = {criterion: best_score}
+    result["tried"] = tried
+    result["failed"] = failed
+    return result
+
+
+# Closed-form forecasters. Most series are 21 sparse annual counts, so instead of running the ARIMA optimizer once per series these fit simple models to every series at once: `values` is an (n_series, n_years) array and each function returns (n_series, steps) forecasts. Loops only run over years or iterations, never over series.
+
+# Last value plus the average yearly change.
+
+def drift_forecast(values, steps=STEPS):
+    n_years = values.shape[1]
+    slope = (values[:, -1] - values[:, 0]) / max(n_years - 1, 1)
+    horizon = np.arange(1, steps + 1)
+    return np.maximum(values[:, -1:] + slope[:, None] * horizon, 0)
+
+
+# Simple exponential smoothing; each series keeps the smoothing factor with the lowest one-step-ahead squared error.
+
+def ses_forecast(values, steps=STEPS, alphas=np.linspace(0.1, 0.9, 9)):
+    level = np.repeat(values[:, :1], len(alphas), axis=1)
+    sse = np.zeros_like(level)
+    for t in range(1, values.shape[1]):
+        error = values[:, t:t + 1] - level
+        sse += error ** 2
+        level = level + alphas * error
+    best = level[np.arange(len(values)), sse.argmin(axis=1)]
+    return np.repeat(best[:, None], steps, axis=1)
+
+
+# Poisson regression of the counts on a linear time trend (log link), fitted for all series together by batched Newton steps.
+
+def poisson_forecast(values, steps=STEPS, iterations=30, ridge=1.0):
+    n_series, n_years = values.shape
+    forecasts = np.zeros((n_series, steps))
+    active = values.sum(axis=1) > 0
+    values = values[active]
+    t = (np.arange(n_years + steps) - (n_years - 1) / 2) / n_years
+    X = np.column_stack([np.ones(n_years), t[:n_years]])
+    X_future = np.column_stack([np.ones(steps), t[n_years:]])
+
+    beta = np.zeros((len(values), 2))
+    beta[:, 0] = np.log(np.maximum(values.mean(axis=1), 1e-3))
+    # A ridge penalty on the slope keeps series with one or two late events from extrapolating exponentially.
+    penalty = np.diag([0.0, ridge])
+    for _ in range(iterations):
+        mu = np.exp(np.clip(beta @ X.T, -20, 20))
+        gradient = (values - mu) @ X - beta @ penalty
+        hessian = np.einsum('sy,yi,yj->sij', mu, X, X) + penalty
+        beta = beta + np.linalg.solve(hessian, gradient[..., None])[..., 0]
+
+    forecasts[active] = np.exp(np.clip(beta @ X_future.T, -20, 20))
+    return forecasts
+
+
+METHODS = {
+    "ARIMA": None,
+    AUTO_METHOD: None,
+    "Exponential smoothing": ses_forecast,
+    "Drift": drift_forecast,
+    "Poisson trend": poisson_forecast,
+}
+
+
+# Forecasts of one closed-form method for every series of Main.csv, computed in one pass per dataset version and looked up by (country, indicator).
+
+def _fast_forecasts(method, steps):
+    def build(main):
+        series = all_series(main)
+        values = np.array([values for _, _, values, _ in series]).reshape(len(series), -1)
+        forecasts = METHODS[method](values, steps)
+        return {(country, indicator): forecasts[i] for i, (country, indicator, _, _) in enumerate(series)}
+
+    return data_store.derived("Main.csv", ("forecast", method, steps), build)
+
+
+# `order` is a (p, d, q) tuple, or one of CRITERIA for the order chosen by select_order, so a searched winner is cached per series and criterion.
+
+def series_key(values, start_year, order=ORDER, steps=STEPS):
+    digest = hashlib.sha256(np.asarray(values, dtype=np.float64).tobytes())
+    digest.update(repr((int(start_year), order if isinstance(order, str) else tuple(order), int(steps))).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, key + ".json")
+
+
+def read_cached(key):
+    try:
+        with open(_cache_path(key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cached(key, result):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = _cache_path(key) + ".%d.tmp" % os.getpid()
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, _cache_path(key))
+
+
+# Every (Country, Indicator) series of Main.csv except the TOTAL rows, as (country, indicator, values, start_year).
+
+def all_series(main=None):
+    main = data_store.load_main() if main is None else main
+    years = data_store.year_columns(main)
+    rows = main[main['Indicator'] != 'TOTAL']
+    values = rows[years].to_numpy(dtype=np.float64)
+    return [
+        (country, indicator, values[i], int(years[0]))
+        for i, (country, indicator) in enumerate(zip(rows['Country'], rows['Indicator']))
+    ]
+
+
+# Identical series share one cache entry, so a result carries no country or indicator.
+
+def _result(start_year, n, order, predictions):
+    first = start_year + n
+    return {
+        "order": list(order) if order is not None else None,
+        "years": list(range(first, first + len(predictions))),
+        "predictions": predictions,
+    }
+
+
+def _as_series(result):
+    index = pd.to_datetime([str(year) for year in result["years"]], format='%Y')
+    series = pd.Series(result["predictions"], index=index)
+    if result.get("order") is not None:
+        series.attrs["order"] = tuple(result["order"])
+    return series
+
+
+# Forecast for one country and indicator. ARIMA forecasts are served from the cache when the series has not changed since it was last fitted; the closed-form methods are computed for all series at once. With AUTO_METHOD (or a criterion as `order`) the order is searched in a background worker process. With wait=False nothing is fitted on the calling thread: an uncached search or fixed-order fit is only started in the background and None is returned, so the caller can show something else until the result is in the cache.
+
+def forecast(country, indicator, order=ORDER, steps=STEPS, method="ARIMA", wait=True):
+    main = data_store.load_main()
+    years = data_store.year_columns(main)
+    first = int(years[-1]) + 1
+
+    if METHODS[method] is not None:
+        predictions = _fast_forecasts(method, steps).get((country, indicator), np.zeros(steps))
+        return _as_series({"years": list(range(first, first + steps)), "predictions": list(predictions)})
+
+    row = main[(main['Country'] == country) & (main['Indicator'] == indicator)]
+    # Countries without a row for an indicator have recorded no events of that type.
+    values = row[years].to_numpy(dtype=np.float64)[0] if len(row) else np.zeros(len(years))
+    start_year = int(years[0])
+
+    if method == AUTO_METHOD and not isinstance(order, str):
+        order = CRITERIA[0]
+    key = series_key(values, start_year, order, steps)
+    result = read_cached(key)
+    if result is None and (isinstance(order, str) or not wait):
+        future = fit_in_background(key, values, start_year, order, steps)
+        if not wait:
+            return None
+        result = future.result()[1]
+    elif result is None:
+        predictions = fit_and_forecast_arima(values, start_year, order, steps)
+        result = _result(start_year, len(values), order, predictions)
+        write_cached(key, result)
+    return _as_series(result)
+
+
+def _fit_task(task):
+    key, values, start_year, order, steps = task
+    if isinstance(order, str):
+        return key, select_order(values, start_year, steps, order)
+    predictions = fit_and_forecast_arima(values, start_year, order, steps)
+    return key, _result(start_year, len(values), order, predictions)
+
+
+# Worker pool for ARIMA fits. The pools are created from multithreaded processes (the Streamlit server, the warm-up thread), where forking could copy a lock held by another thread, so their workers are started fresh (forkserver where available, otherwise spawn).
+
+def _pool(max_workers=None):
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+
+
+# Order searches and fits started by the page run in a small process pool, so they neither block a session's script thread nor compete with it for the GIL. A search or fit that is already running is not started twice.
+
+_background = None
+_pending = {}
+_background_lock = threading.RLock()
+
+
+def fit_in_background(key, values, start_year, order=CRITERIA[0], steps=STEPS):
+    global _background
+    with _background_lock:
+        future = _pending.get(key)
+        if future is not None:
+            return future
+        if _background is None:
+            _background = _pool(BACKGROUND_WORKERS)
+        future = _background.submit(_fit_task, (key, values, start_year, order, steps))
+        _pending[key] = future
+    future.add_done_callback(_store)
+    return future
+
+
+def _store(future):
+    error = future.exception()
+    if error is None:
+        key, result = future.result()
+        write_cached(key, result)
+        if "tried" in result:
+            logger.info("Order search done: ARIMA%s after %d fits", tuple(result["order"] or ()), result["tried"])
+        else:
+            logger.info("Background fit done: ARIMA%s", tuple(result["order"]))
+    else:
+        logger.warning("Background fit failed: %s", error)
+    with _background_lock:
+        for key, pending in list(_pending.items()):
+            if pending is future:
+                del _pending[key]
+
+
+# Fits every series whose forecast is not cached yet across a process pool and stores the results. Identical series are fitted once. `order` can be a criterion to search every series' order. Returns how many series were found and how many models (or searches) had to be run.
+
+def forecast_all(order=ORDER, steps=STEPS, workers=None):
+    start = time.perf_counter()
+    tasks = {}
+    series = all_series()
+    for _, _, values, start_year in series:
+        key = series_key(values, start_year, order, steps)
+        if key not in tasks and not os.path.exists(_cache_path(key)):
+            tasks[key] = (key, values, start_year, order, steps)
+
+    if tasks:
+        with _pool(workers) as pool:
+            for key, result in pool.map(_fit_task, tasks.values(), chunksize=8):
+                write_cached(key, result)
+
+    summary = {
+        "series": len(series),
+        "fitted": len(tasks),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    logger.info("Batch forecast: %s", summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast every (Country, Indicator) series of Main.csv into the forecast cache.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--order", type=int, nargs=3, default=list(ORDER), metavar=("P", "D", "Q"))
+    parser.add_argument("--auto", choices=CRITERIA, help="search each series' order by this criterion instead of using --order")
+    parser.add_argument("--steps", type=int, default=STEPS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    print(forecast_all(args.auto or tuple(args.order), args.steps, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import altair as alt
+import streamlit as st
+
+import data_store
+import aggregates
+import charts
+import profiling
+import similarity
+
+# One page per disaster type, all drawn by render() from an entry of the HAZARDS registry. Each page lets users compare the yearly frequency of the disaster across selected countries, shows its geographical distribution on a choropleth map, the count per year for one country with the countries whose yearly counts are most similar to it, a bubble chart of the total per country and a pie chart of each year's contribution to the total. Charts only carry the columns they encode (charts.chart_data), and chart data and Altair charts are memoized in the shared bounded cache in charts.py under the disaster type and the user's selection, so a rerun with the same selection rebuilds nothing. Adding a disaster type only needs a new registry entry.
+
+
+class Hazard:
+
+    def __init__(self, title, indicator, plural, color, frequency_field=None, count_field=None, count_title=None):
+        self.title = title
+        self.indicator = indicator
+        self.plural = plural
+        self.color = color
+        self.frequency_field = frequency_field or f"{title} Frequency"
+        self.count_field = count_field or f"{title}_Count"
+        self.count_title = count_title or f"{title} Count"
+
+
+# Navigation label -> disaster type, in menu order.
+
+HAZARDS = {
+    "Drought Analysis": Hazard("Drought", "Drought", "Droughts", "brown"),
+    "Extreme Temperature Analysis": Hazard("Extreme Temperature", "Extreme temperature", "Extreme Temperatures", "red", "Frequency", "Count", "Count"),
+    "Flood Analysis": Hazard("Flood", "Flood", "Floods", "blue"),
+    "Landslide Analysis": Hazard("Landslide", "Landslide", "Landslides", "yellow"),
+    "Storm Analysis": Hazard("Storm", "Storm", "Storms", "purple"),
+    "Wildfire Analysis": Hazard("Wildfire", "Wildfire", "Wildfires", "orange"),
+}
+
+
+def frequency_chart(hazard, countries):
+    def build():
+        melted_data = data_store.long_table().countries(countries, hazard.indicator).rename(columns={'Count': hazard.frequency_field})
+        return alt.Chart(charts.chart_data(melted_data, 'Country', 'Year', hazard.frequency_field)).mark_bar().encode(
+            x=alt.X('Year:N', title='Year', axis=alt.Axis(labelAngle=-45)),
+            y=alt.Y(f'{hazard.frequency_field}:Q', title=hazard.frequency_field),
+            color=alt.Color('Country:N', legend=alt.Legend(title="Country")),
+        ).properties(
+            width=800,
+            height=500,
+            title=f"{hazard.title} Frequency by Country"
+        )
+
+    return charts.cached(("frequency", hazard.indicator, tuple(countries)), build)
+
+
+def country_chart(hazard, country):
+    def build():
+        melted_data = data_store.long_table().series(country, hazard.indicator).rename(columns={'Count': hazard.count_field})
+        return alt.Chart(charts.chart_data(melted_data, 'Year', hazard.count_field)).mark_bar(color=hazard.color).encode(
+            x=alt.X('Year:N', title='Year'),
+            y=alt.Y(f'{hazard.count_field}:Q', title=hazard.count_title),
+            tooltip=['Year', hazard.count_field]
+        ).properties(
+            width=600,
+            height=500,
+            title=f"Country selected - {country}"
+        )
+
+    return charts.cached(("country", hazard.indicator, country), build)
+
+
+def similar_chart(hazard, country, similar_countries):
+    def build():
+        melted_data = data_store.long_table().countries([country, *similar_countries], hazard.indicator).rename(columns={'Count': hazard.count_field})
+        return alt.Chart(charts.chart_data(melted_data, 'Country', 'Year', hazard.count_field)).mark_line(point=True).encode(
+            x=alt.X('Year:N', title='Year'),
+            y=alt.Y(f'{hazard.count_field}:Q', title=hazard.count_title),
+            color=alt.Color('Country:N', legend=alt.Legend(title="Country"), sort=[country, *similar_countries]),
+            tooltip=['Country', 'Year', hazard.count_field]
+        ).properties(
+            width=600,
+            height=400,
+            title=f"{country} and the most similar countries"
+        )
+
+    return charts.cached(("similar", hazard.indicator, country, tuple(similar_countries)), build)
+
+
+def bubble_chart(hazard):
+    def build():
+        return alt.Chart(aggregates.cube().country_totals(hazard.indicator)).mark_circle().encode(
+            x=alt.X('Country:N', sort='-y'),
+            y=alt.Y('Total:Q', title=f'Total Number of {hazard.plural}'),
+            color=alt.Color('Country:N', legend=None),
+            size=alt.Size('Total:Q', legend=None),
+            tooltip=['Country', 'Total']
+        ).properties(
+            width=700,
+            height=500
+        ).interactive()
+
+    return charts.cached(("bubble", hazard.indicator), build)
+
+
+def render(hazard):
+
+    with profiling.section(f"Load {hazard.title} rows") as section:
+        df = data_store.hazard(hazard.indicator)
+        section.rows = len(df)
+
+    countries = df['Country'].unique()
+
+    st.write(f"# {hazard.title} Frequency by Country")
+
+    selected_countries = st.multiselect("Select countries", countries, default=["United States", "India"])
+
+    with profiling.section("Frequency by country") as section:
+        chart = frequency_chart(hazard, selected_countries)
+        section.rows = len(chart.data)
+        st.altair_chart(section.payload(chart))
+
+    ###############################################################
+
+    st.write(f"### Geographical Distribution of {hazard.title} Occurrences Among Various Countries")
+    with profiling.section("Map", rows=len(countries)) as section:
+        fig = charts.choropleth(hazard.indicator, scope='world')
+
+        st.plotly_chart(section.payload(fig))
+
+    ###############################################################
+
+    st.write(f"## {hazard.title} Count by Year for a Specific Country")
+
+    selected_country = st.selectbox("Select a Country", countries, key='chart2')
+
+    with profiling.section("Count by year") as section:
+        chart = country_chart(hazard, selected_country)
+        section.rows = len(chart.data)
+        st.altair_chart(section.payload(chart))
+
+    st.write(f"### Countries with a Similar {hazard.title} Profile")
+
+    metric = st.radio("Similarity measure", similarity.METRICS, horizontal=True, key='similarity_metric')
+
+    with profiling.section("Similar countries") as section:
+        similar = similarity.similar(selected_country, hazard.indicator, metric)
+        section.rows = len(similar)
+        if similar.empty:
+            st.write(f"{selected_country} has too few {hazard.title.lower()} occurrences to compare.")
+        else:
+            score = 'Distance' if metric == "DTW-lite" else 'Similarity'
+            st.dataframe(similar.rename(columns={'Score': score}).round(3), hide_index=True)
+            st.altair_chart(section.payload(similar_chart(hazard, selected_country, similar['Country'].tolist())))
+
+    ###############################################################
+
+    st.write(f"### Proportion of Total Number of {hazard.plural} by Country")
+
+    with profiling.section("Total by country") as section:
+        chart = bubble_chart(hazard)
+        section.rows = len(chart.data)
+        st.altair_chart(section.payload(chart))
+
+    ###############################################################
+
+    st.write(f"### Contribution of Each Year's {hazard.title} Occurrences to the Total Number of {hazard.plural}")
+
+    with profiling.section("Share of each year", rows=len(aggregates.cube().years)) as section:
+        fig = charts.year_share_pie(hazard.indicator)
+
+        st.plotly_chart(section.payload(fig))
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import columnar
+
+# Incremental updates of Main.csv. A delta is a table with Country and Indicator columns and the year columns that changed, for example one country's revised counts or a whole new year. Only the rows it names are rewritten: their Total is recomputed, the TOTAL rows of the affected countries are rebuilt, and of everything cached for the old version only what depends on the changed rows is dropped:
+#
+#   aggregate cube, closed-form forecasts    patched with the changed rows
+#   hazard tables, similarity indexes,       kept for the disaster types the delta does not touch
+#   maps, year-share pies, bubble charts
+#   selection charts (charts.cached)         kept unless they show a changed country/disaster type pair
+#   ARIMA forecasts                          kept for unchanged series, their cache key is the series itself
+#
+# The whole-table values (long and wide tables, sparse store, trend statistics, table sort orders) cover every row and are rebuilt on their next use; each takes a few milliseconds at the size of Main.csv. A delta that adds year columns changes every row, so it drops everything.
+
+logger = logging.getLogger(__name__)
+
+TOTAL = 'TOTAL'
+
+
+class Change:
+
+    def __init__(self, old_rows, new_rows, new_years):
+        self.old_rows = old_rows
+        self.new_rows = new_rows
+        self.new_years = new_years
+        self.countries = set(new_rows['Country'])
+        self.indicators = set(new_rows['Indicator'])
+        self.pairs = set(zip(new_rows['Country'], new_rows['Indicator']))
+
+
+# Applies the delta to a copy of the Main.csv table. Returns the patched table and a Change describing the rows that differ.
+
+def apply_delta(main, delta):
+    years = data_store.year_columns(main)
+    delta_years = data_store.year_columns(delta)
+    new_years = sorted(set(delta_years) - set(years), key=int)
+
+    table = main.astype({'Country': str, 'Indicator': str}).set_index(['Country', 'Indicator'])
+    table = table.astype({year: np.float64 for year in years + ['Total']})
+    for year in new_years:
+        table.insert(table.columns.get_loc('Total'), year, 0.0)
+    years = years + new_years
+
+    delta = delta[delta['Indicator'] != TOTAL].astype({'Country': str, 'Indicator': str}).set_index(['Country', 'Indicator'])
+    added = delta.index.difference(table.index)
+    if len(added):
+        rows = pd.DataFrame(0.0, index=added, columns=table.columns)
+        rows['ObjectId'] = np.arange(len(added)) + table['ObjectId'].max() + 1
+        table = pd.concat([table, rows])
+    table.loc[delta.index, delta_years] = delta[delta_years].to_numpy(dtype=np.float64)
+
+    countries = delta.index.get_level_values('Country').unique()
+    hazard_rows = table.loc[table.index.get_level_values('Country').isin(countries)]
+    hazard_rows = hazard_rows[hazard_rows.index.get_level_values('Indicator') != TOTAL]
+    totals = hazard_rows[years].groupby(level='Country').sum()
+    totals.index = pd.MultiIndex.from_product([totals.index, [TOTAL]], names=['Country', 'Indicator'])
+    missing = totals.index.difference(table.index)
+    if len(missing):
+        rows = pd.DataFrame(0.0, index=missing, columns=table.columns)
+        rows['ObjectId'] = np.arange(len(missing)) + table['ObjectId'].max() + 1
+        table = pd.concat([table, rows])
+    table.loc[totals.index, years] = totals.to_numpy()
+
+    touched = delta.index.union(totals.index)
+    table.loc[touched, 'Total'] = table.loc[touched, years].sum(axis=1)
+    table['ObjectId'] = table['ObjectId'].astype(np.int64)
+
+    patched = table.reset_index()[['ObjectId', 'Country', 'Indicator'] + years + ['Total']]
+    old_rows = main[pd.MultiIndex.from_frame(main[['Country', 'Indicator']].astype(str)).isin(touched)]
+    new_rows = table.loc[touched].reset_index()[patched.columns]
+    return patched, Change(old_rows, new_rows, new_years)
+
+
+# Decides what survives of one value derived from the old table (see data_store.refresh).
+
+def _carry_over(change):
+    def keep(key, value):
+        if change.new_years:
+            return None
+        kind = key[0] if isinstance(key, tuple) else key
+
+        if kind == "cube":
+            return value.patched(change.old_rows, change.new_rows)
+        if kind in ("hazard", "similarity", "choropleth", "year_share_pie"):
+            return value if key[1] not in change.indicators and key[1] != TOTAL else None
+        if kind == "forecast":
+            return _patched_forecasts(value, key[1], key[2], change)
+        return None
+
+    return keep
+
+
+# Whether a chart of the old version (key as passed to charts.cached) still shows the same data.
+
+def _keep_chart(change):
+    def keep(key):
+        if change.new_years:
+            return False
+        kind = key[0]
+
+        if kind in ("frequency", "similar", "bubble"):
+            return key[1] not in change.indicators
+        if kind == "country":
+            return (key[2], key[1]) not in change.pairs
+        if kind in ("country_total", "country_trend", "country_breakdown"):
+            return key[1] not in change.countries
+        return False
+
+    return keep
+
+
+def _carry_charts(path, old_mtime, new_mtime, change):
+    import charts
+
+    name = os.path.basename(path)
+    return charts.chart_cache.carry_over((name, old_mtime), (name, new_mtime), _keep_chart(change))
+
+
+# The record of the last update: the stamps of Main.csv before and after it and the rows it changed, in their state before and after.
+
+def _record(path, old_mtime, new_mtime, change):
+    record = {
+        "from": list(old_mtime),
+        "to": list(new_mtime),
+        "new_years": change.new_years,
+        "old_rows": json.loads(change.old_rows.to_json(orient="split", index=False)),
+        "new_rows": json.loads(change.new_rows.to_json(orient="split", index=False)),
+    }
+    tmp = path + data_store.CHANGE_SUFFIX + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(record, f)
+    os.replace(tmp, path + data_store.CHANGE_SUFFIX)
+
+
+# Called by data_store when it reloads `path` from the version stamped old_mtime to new_mtime. If that is the recorded update, moves the unaffected charts over and returns the keep function for the derived values; otherwise None, and everything is rebuilt.
+
+def recorded_carry_over(path, old_mtime, new_mtime):
+    try:
+        with open(path + data_store.CHANGE_SUFFIX) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if tuple(record["from"]) != tuple(old_mtime) or tuple(record["to"]) != tuple(new_mtime):
+        return None
+
+    rows = [pd.DataFrame(record[part]["data"], columns=record[part]["columns"]) for part in ("old_rows", "new_rows")]
+    change = Change(*rows, record["new_years"])
+    kept = _carry_charts(path, old_mtime, new_mtime, change)
+    logger.info("Applying the recorded update of %s: %d rows changed, kept %d cached charts", os.path.basename(path), len(change.new_rows), kept)
+    return _carry_over(change)
+
+
+def _patched_forecasts(forecasts, method, steps, change):
+    import forecasting
+
+    rows = change.new_rows[change.new_rows['Indicator'] != TOTAL]
+    values = rows[data_store.year_columns(rows)].to_numpy(dtype=np.float64)
+    patched = dict(forecasts)
+    for pair, predictions in zip(zip(rows['Country'], rows['Indicator']), forecasting.METHODS[method](values, steps)):
+        patched[pair] = predictions
+    return patched
+
+
+# Applies a delta to Main.csv (and its columnar store, if there is one), refreshes the in-process caches and returns the Change. Frames that sessions already hold stay valid: the new CSV and store are written next to the current ones and swapped in (store first, it only counts once the CSV matches it), and only then are the caches refreshed. The change is also recorded next to Main.csv, so other processes that have the old version cached (the dashboard server, api.py) carry their caches over in the same way when they notice the new file.
+
+def update(delta, refit=False):
+    start = time.perf_counter()
+    path = os.path.join(data_store.DATA_DIR, "Main.csv")
+    old_mtime = data_store.version("Main.csv")[1]
+    patched, change = apply_delta(data_store.load_main(), delta)
+
+    tmp = path + ".tmp"
+    patched.to_csv(tmp, index=False)
+    schema = os.path.join(columnar.store_path(path), columnar.SCHEMA)
+    if columnar.read_schema(columnar.store_path(path)) is not None:
+        # os.replace keeps the mtime, so the store already matches the CSV it is about to replace.
+        columnar.write_store(patched, columnar.store_path(path), os.stat(tmp).st_mtime_ns)
+    # The stamp data_store will see once the CSV is in place (see data_store._mtime).
+    new_mtime = tuple(os.stat(p).st_mtime_ns for p in (tmp, schema) if os.path.exists(p))
+    _record(path, old_mtime, new_mtime, change)
+    os.replace(tmp, path)
+
+    data_store.refresh("Main.csv", _carry_over(change))
+    kept = _carry_charts(path, old_mtime, data_store.version("Main.csv")[1], change)
+    logger.info("Updated %d rows (%d countries, %d new years) in %.3fs, kept %d cached charts", len(change.new_rows), len(change.countries), len(change.new_years), time.perf_counter() - start, kept)
+
+    if refit:
+        import forecasting
+        for country, indicator in sorted(change.pairs):
+            forecasting.forecast(country, indicator)
+    return change
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply changed rows or new year columns to Main.csv without rebuilding everything.")
+    parser.add_argument("delta", help="CSV with Country, Indicator and the changed year columns")
+    parser.add_argument("--refit", action="store_true", help="also fit the ARIMA forecasts of the changed series now")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    update(pd.read_csv(args.delta), args.refit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import data_store
+
+# Regenerates the annual count table (Main.csv) from raw event records. Each input row is one disaster event with a country, a disaster type and a year or date. The files are streamed in chunks and only the running (Country, Indicator, Year) counts are kept, so memory depends on the number of distinct keys, not on the number of events. The output has the schema the pages read: ObjectId, Country, Indicator, one column per year, Total, plus a TOTAL row per country, with as many year columns as the events cover.
+
+logger = logging.getLogger(__name__)
+
+KEYS = ['Country', 'Indicator', 'Year']
+
+
+# Streams the event files and returns the number of events per (Country, Indicator, Year).
+
+def count_events(paths, country_column='Country', indicator_column='Indicator', year_column='Year', date_column=None, chunksize=100_000):
+    counts = pd.Series(0, index=pd.MultiIndex.from_tuples([], names=KEYS), dtype='int64')
+    events = skipped = 0
+    usecols = [country_column, indicator_column, date_column or year_column]
+
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+            if date_column is not None:
+                years = pd.to_datetime(chunk[date_column], errors='coerce').dt.year
+            else:
+                years = pd.to_numeric(chunk[year_column], errors='coerce')
+            chunk = pd.DataFrame({
+                'Country': chunk[country_column],
+                'Indicator': chunk[indicator_column],
+                'Year': years,
+            }).dropna()
+            skipped += len(years) - len(chunk)
+            events += len(chunk)
+
+            part = chunk.astype({'Year': 'int64'}).groupby(KEYS).size()
+            counts = counts.add(part, fill_value=0).astype('int64')
+
+    if skipped:
+        logger.warning("Skipped %d events without a country, disaster type or year", skipped)
+    logger.info("Counted %d events into %d (Country, Indicator, Year) cells", events, len(counts))
+    return counts
+
+
+# Lays the counts out in the Main.csv schema. The year columns run from first_year to last_year (by default the range the events cover), so new years simply add columns. `keep_rows` is an optional table whose (Country, Indicator) rows are kept even without events, the way Main.csv lists some all-zero rows; its rows also keep their order and, if it has an ObjectId column, their ids, with new rows numbered after the largest id. Otherwise rows are sorted by country and disaster type and numbered from 1.
+
+def to_wide(counts, first_year=None, last_year=None, keep_rows=None):
+    years = counts.index.get_level_values('Year')
+    first_year = int(years.min()) if first_year is None else first_year
+    last_year = int(years.max()) if last_year is None else last_year
+
+    wide = counts.unstack('Year', fill_value=0).reindex(columns=range(first_year, last_year + 1), fill_value=0)
+    if keep_rows is not None:
+        keep = keep_rows.loc[keep_rows['Indicator'] != 'TOTAL', ['Country', 'Indicator']].astype(str)
+        wide = wide.reindex(wide.index.union(pd.MultiIndex.from_frame(keep)), fill_value=0)
+    else:
+        wide = wide[wide.sum(axis=1) > 0]
+    totals = wide.groupby(level='Country').sum()
+    totals.index = pd.MultiIndex.from_product([totals.index, ['TOTAL']], names=['Country', 'Indicator'])
+
+    wide = pd.concat([wide, totals]).sort_index()
+    wide.columns = [str(year) for year in wide.columns]
+    wide['Total'] = wide.sum(axis=1)
+    wide = wide.reset_index()
+    ids = np.arange(1, len(wide) + 1)
+    if keep_rows is not None:
+        # Rows of keep_rows come first in its order, new rows after them.
+        known = pd.MultiIndex.from_frame(keep_rows[['Country', 'Indicator']].astype(str))
+        position = known.get_indexer(pd.MultiIndex.from_frame(wide[['Country', 'Indicator']]))
+        order = np.lexsort((np.arange(len(wide)), np.where(position >= 0, position, len(known))))
+        wide = wide.iloc[order].reset_index(drop=True)
+        if 'ObjectId' in keep_rows:
+            ids = keep_rows['ObjectId'].to_numpy(dtype=np.float64)[position[order]]
+            new = position[order] < 0
+            ids[new] = np.arange(new.sum()) + keep_rows['ObjectId'].max() + 1
+    wide.insert(0, 'ObjectId', ids.astype(np.int64))
+    return wide
+
+
+def write_table(frame, path):
+    tmp = path + ".tmp"
+    frame.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate raw disaster event records into the annual count table.")
+    parser.add_argument("events", nargs="+", help="CSV files with one row per event")
+    parser.add_argument("--output", default=os.path.join(data_store.DATA_DIR, "Main.csv"))
+    parser.add_argument("--country-column", default="Country")
+    parser.add_argument("--indicator-column", default="Indicator", help="column holding the disaster type")
+    parser.add_argument("--year-column", default="Year")
+    parser.add_argument("--date-column", help="take the year from this date column instead of --year-column")
+    parser.add_argument("--first-year", type=int)
+    parser.add_argument("--last-year", type=int)
+    parser.add_argument("--keep-rows", help="table (e.g. the current Main.csv) whose Country/Indicator rows are kept even without events, with their ObjectId")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="events read per chunk")
+    parser.add_argument("--columnar", action="store_true", help="also rebuild the columnar store (see columnar.py)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    start = time.perf_counter()
+    counts = count_events(args.events, args.country_column, args.indicator_column, args.year_column, args.date_column, args.chunksize)
+    if counts.empty:
+        parser.error("no events found")
+    keep_rows = pd.read_csv(args.keep_rows, usecols=lambda column: column in ('ObjectId', 'Country', 'Indicator')) if args.keep_rows else None
+    wide = to_wide(counts, args.first_year, args.last_year, keep_rows)
+    write_table(wide, args.output)
+    logger.info("Wrote %s: %d rows, years %s-%s in %.2fs", args.output, len(wide), wide.columns[3], wide.columns[-2], time.perf_counter() - start)
+
+    if args.columnar:
+        import columnar
+        columnar.convert(args.output)
+
+
+if __name__ == "__main__":
+    main()
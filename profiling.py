@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+import data_store
+import charts
+
+# Timing of the sections of a page. Every chart section, data load and model fit in the page functions runs inside section(), which records its wall time, the number of rows it processed and, while profiling is switched on, the size of the chart it sends to the browser. The records of a rerun are shown in the sidebar debug panel (the "Profiler" checkbox), kept for the session so they can be downloaded as JSON lines, logged as one JSON record per rerun on the "profiling" logger, and appended to the file named by the PROFILE_LOG environment variable for offline analysis.
+#
+# Each Streamlit session runs its script in its own thread, so the rerun being recorded is kept per thread.
+
+logger = logging.getLogger("profiling")
+
+LOG_FILE = os.environ.get("PROFILE_LOG")
+HISTORY = 50
+
+_current = threading.local()
+_file_lock = threading.Lock()
+
+
+class Section:
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.payload_bytes = None
+        self.seconds = 0.0
+
+    # Records the size of what a chart sends to the browser (spec and data) and returns the chart, so it can wrap the argument of st.altair_chart / st.plotly_chart. Serializing a chart is not free, so this only measures while profiling is on.
+
+    def payload(self, chart):
+        run = getattr(_current, "run", None)
+        if run is not None and run.measure_payloads:
+            if hasattr(chart, "to_plotly_json"):
+                size = len(chart.to_json())
+            else:
+                size = len(chart.to_json(validate=False, indent=None))
+            self.payload_bytes = (self.payload_bytes or 0) + size
+        return chart
+
+    def record(self):
+        return {"section": self.name, "ms": round(self.seconds * 1000, 2), "rows": self.rows, "payload_bytes": self.payload_bytes}
+
+
+class Run:
+
+    def __init__(self, page, measure_payloads):
+        self.page = page
+        self.measure_payloads = measure_payloads
+        self.sections = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def record(self):
+        return {
+            "page": self.page,
+            "started_at": self.started_at,
+            "ms": round(self.seconds * 1000, 2),
+            "sections": [section.record() for section in self.sections],
+        }
+
+
+# Starts recording a rerun of `page`. Payload sizes are measured when the debug panel is open or PROFILE_LOG is set.
+
+def start(page, measure_payloads=False):
+    _current.run = Run(page, measure_payloads or LOG_FILE is not None)
+    return _current.run
+
+
+# Times the body of the with-block as one section of the current rerun. Sections outside a recorded rerun are timed but not kept.
+
+@contextmanager
+def section(name, rows=None):
+    record = Section(name, rows)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        run = getattr(_current, "run", None)
+        if run is not None:
+            run.sections.append(record)
+
+
+# Ends the current rerun, exports its record and adds it to the session's history. Returns the finished Run.
+
+def finish():
+    run = getattr(_current, "run", None)
+    if run is None:
+        return None
+    _current.run = None
+    run.seconds = time.perf_counter() - run.start
+    record = run.record()
+
+    if logger.isEnabledFor(logging.INFO) or LOG_FILE:
+        line = json.dumps(record)
+        logger.info(line)
+        if LOG_FILE:
+            with _file_lock, open(LOG_FILE, "a") as f:
+                f.write(line + "\n")
+
+    history = st.session_state.setdefault("profile_history", [])
+    history.append(record)
+    del history[:-HISTORY]
+    return run
+
+
+def sections_frame(run):
+    frame = pd.DataFrame([section.record() for section in run.sections], columns=["section", "ms", "rows", "payload_bytes"])
+    frame["share"] = (frame["ms"] / (run.seconds * 1000) * 100).round(1) if run.seconds else 0.0
+    return frame
+
+
+# Sidebar debug panel: the sections of the last rerun, slowest first, a download of the session's reruns as JSON lines, and the hit/miss counts of the process-wide data and chart caches.
+
+def render_panel(run):
+    panel = st.sidebar.expander("Profiler", expanded=True)
+    panel.caption(f"{run.page}: {run.seconds * 1000:.0f} ms, {len(run.sections)} sections")
+    panel.dataframe(sections_frame(run).sort_values("ms", ascending=False), hide_index=True)
+    history = st.session_state.get("profile_history", [])
+    panel.download_button(
+        "Download timings (JSON lines)",
+        "\n".join(json.dumps(record) for record in history),
+        file_name="timings.jsonl",
+        mime="application/json",
+    )
+
+    data = data_store.cache_stats()
+    chart = charts.chart_cache.stats()
+    panel.caption(
+        f"Data cache: {data['hits']} hits, {data['misses']} misses, {data['reloads']} reloads. "
+        f"Chart cache: {chart['entries']} entries ({chart['bytes'] / 1024:.0f} KiB), {chart['hits']} hits, {chart['misses']} misses."
+    )
+    panel.dataframe(pd.DataFrame.from_dict(data["files"], orient="index").drop(columns="loaded_at"))
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+import data_store
+import sparse_counts
+
+# Which countries have a disaster profile like a given one. For each disaster type the yearly counts of every country form a country x year matrix (from the sparse store), and three measures compare the rows:
+#
+#   Cosine       angle between the count vectors: similar years, whatever the magnitude
+#   Correlation  Pearson correlation: similar ups and downs around each country's own mean
+#   DTW-lite     dynamic time warping on the standardized series, limited to a band of WINDOW years, so a peak a year or two earlier or later still matches
+#
+# Row-normalized matrices for cosine and correlation are precomputed once per disaster type and dataset version, and the K nearest neighbours of every country are found with batched matrix products, so a query is a lookup in the top-k index. DTW-lite is computed per query, vectorized over all candidate countries at once. Countries without any occurrence of the disaster type (or, for correlation and DTW-lite, with the same count every year) have no profile and are left out.
+
+TOTAL = 'TOTAL'
+METRICS = ("Cosine", "Correlation", "DTW-lite")
+K = 20
+WINDOW = 2
+BATCH = 1024
+DECIMALS = 12
+
+
+def _normalized(matrix, center):
+    if center:
+        matrix = matrix - matrix.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = norms > 1e-12
+    unit = np.zeros_like(matrix)
+    unit[valid] = matrix[valid] / norms[valid, None]
+    return unit, valid
+
+
+# Top-k neighbours of every row by dot product of unit rows, computed in batches of rows so memory stays at BATCH x n. Rows that are not valid are never returned as neighbours.
+
+def _top_k_index(unit, valid, k):
+    n = len(unit)
+    k = max(0, min(k, int(valid.sum()) - 1))
+    neighbours = np.zeros((n, k), dtype=np.int32)
+    scores = np.zeros((n, k))
+    if k == 0:
+        return neighbours, scores
+    for start in range(0, n, BATCH):
+        stop = min(start + BATCH, n)
+        # Rounded so that ties (e.g. countries with identical counts) stay exact ties whatever the batch boundaries.
+        block = np.round(unit[start:stop] @ unit.T, DECIMALS)
+        block[:, ~valid] = -np.inf
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        # Every score above the row's k-th largest, then as many of those tied with it as fit, in country order.
+        threshold = np.partition(block, n - k, axis=1)[:, n - k, None]
+        above = block > threshold
+        tied = block == threshold
+        chosen = above | (tied & (np.cumsum(tied, axis=1) <= k - above.sum(axis=1, keepdims=True)))
+        top = np.nonzero(chosen)[1].reshape(stop - start, k)
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        neighbours[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbours, scores
+
+
+# Band-limited DTW distance between one series and each row of `candidates`, all candidates advanced together.
+
+def dtw_distances(query, candidates, window=WINDOW):
+    n_years = len(query)
+    cost = np.full((len(candidates), n_years + 1, n_years + 1), np.inf)
+    cost[:, 0, 0] = 0.0
+    for i in range(1, n_years + 1):
+        for j in range(max(1, i - window), min(n_years, i + window) + 1):
+            step = (query[i - 1] - candidates[:, j - 1]) ** 2
+            cost[:, i, j] = step + np.minimum(np.minimum(cost[:, i - 1, j], cost[:, i, j - 1]), cost[:, i - 1, j - 1])
+    return np.sqrt(cost[:, n_years, n_years])
+
+
+class SimilarityIndex:
+
+    def __init__(self, counts, indicator, k=K):
+        self.indicator = indicator
+        self.years = counts.years
+        self.countries = counts.countries
+        self.country_index = counts.country_index
+
+        mask = slice(None) if indicator == TOTAL else counts.indicator_codes == counts.indicator_index[indicator]
+        self.matrix = np.zeros((len(counts.countries), len(counts.years)))
+        np.add.at(self.matrix, (counts.country_codes[mask], counts.year_codes[mask]), counts.values[mask])
+
+        self.unit, self.has_events = _normalized(self.matrix, center=False)
+        self.centered, self.varies = _normalized(self.matrix, center=True)
+        # Centered unit rows times sqrt(years) are the z-scores DTW-lite compares.
+        self.standardized = self.centered * np.sqrt(len(self.years))
+
+        self.cosine = _top_k_index(self.unit, self.has_events, k)
+        self.correlation = _top_k_index(self.centered, self.varies, k)
+
+    def _rows(self, metric):
+        return (self.unit, self.has_events) if metric == "Cosine" else (self.centered, self.varies)
+
+    def has_profile(self, country, metric="Cosine"):
+        row = self.country_index.get(country)
+        return row is not None and bool(self._rows(metric)[1][row])
+
+    # The k countries most similar to `country`, most similar first, with their score: the cosine similarity or correlation (higher is closer) or the DTW-lite distance (lower is closer). Empty if the country has no profile.
+
+    def similar(self, country, metric="Cosine", k=5):
+        if not self.has_profile(country, metric):
+            return pd.DataFrame({'Country': pd.Series(dtype=object), 'Score': pd.Series(dtype=float)})
+        row = self.country_index[country]
+        unit, valid = self._rows(metric)
+
+        if metric == "DTW-lite":
+            candidates = np.flatnonzero(valid)
+            candidates = candidates[candidates != row]
+            distances = dtw_distances(self.standardized[row], self.standardized[candidates])
+            top = sparse_counts.top_k(-distances, k)
+            return pd.DataFrame({'Country': self.countries[candidates[top]], 'Score': distances[top]})
+
+        neighbours, scores = self.cosine if metric == "Cosine" else self.correlation
+        if k <= neighbours.shape[1]:
+            return pd.DataFrame({'Country': self.countries[neighbours[row, :k]], 'Score': scores[row, :k]})
+
+        # More neighbours than the index keeps: score this one row against all.
+        scores = np.round(unit @ unit[row], DECIMALS)
+        scores[~valid] = -np.inf
+        scores[row] = -np.inf
+        top = sparse_counts.top_k(scores, k)
+        top = top[np.isfinite(scores[top])]
+        return pd.DataFrame({'Country': self.countries[top], 'Score': scores[top]})
+
+
+# Similarity index of one disaster type ('TOTAL' for all together), built once per version of Main.csv.
+
+def index(indicator):
+    return data_store.derived("Main.csv", ("similarity", indicator), lambda main: SimilarityIndex(sparse_counts.sparse_counts(), indicator))
+
+
+def similar(country, indicator, metric="Cosine", k=5):
+    return index(indicator).similar(country, metric, k)
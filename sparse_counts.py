@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+import data_store
+
+# Sparse store of the (Country, Indicator, Year) counts. About 70% of the year cells in Main.csv are zero (few countries have landslides or wildfires in a given year), so only the non-zero cells are kept, as coordinate arrays sorted by country, disaster type and year. Memory and the cost of the sums below grow with the number of non-zero cells, not with countries x disaster types x years. TOTAL rows are not stored; they are the per-country sums.
+#
+# The dashboard pages keep reading aggregates.cube(): their maps, bubble charts and breakdowns list every country that has a row for a disaster type, including rows whose counts are all zero, which a store of non-zero cells cannot tell apart from missing rows, and incremental.py patches the cube in place where this store would be rebuilt. At the size of Main.csv the cube's dense country x disaster type arrays are no larger than this store. The store serves what is proportional to the occurrences rather than to the table: the API's /top-countries and the similarity indexes behind /similar and the Similar countries sections.
+
+TOTAL = 'TOTAL'
+
+
+class SparseCounts:
+
+    def __init__(self, countries, indicators, years, country, indicator, year, count):
+        self.countries = np.asarray(countries, dtype=object)
+        self.indicators = np.asarray(indicators, dtype=object)
+        self.years = list(years)
+        self.country_index = {name: i for i, name in enumerate(self.countries)}
+        self.indicator_index = {name: i for i, name in enumerate(self.indicators)}
+
+        country, indicator, year, count = (np.asarray(a) for a in (country, indicator, year, count))
+        keep = count != 0
+        order = np.lexsort((year[keep], indicator[keep], country[keep]))
+        self.country_codes = country[keep][order].astype(np.int16 if len(self.countries) < 2 ** 15 else np.int32)
+        self.indicator_codes = indicator[keep][order].astype(np.int16)
+        self.year_codes = year[keep][order].astype(np.int16)
+        self.values = count[keep][order]
+        if np.array_equal(self.values, np.round(self.values)) and np.abs(self.values).max(initial=0) < 2 ** 31:
+            self.values = self.values.astype(np.int32)
+
+        for array in self._arrays():
+            array.flags.writeable = False
+
+    # From a table in the Main.csv layout.
+
+    @classmethod
+    def from_wide(cls, main):
+        years = data_store.year_columns(main)
+        rows = main[main['Indicator'] != TOTAL]
+        countries = np.array(sorted(rows['Country'].unique()), dtype=object)
+        indicators = np.array(sorted(rows['Indicator'].unique()), dtype=object)
+
+        values = rows[years].to_numpy()
+        r, y = np.nonzero(values)
+        c = pd.Categorical(rows['Country'], categories=countries).codes
+        i = pd.Categorical(rows['Indicator'], categories=indicators).codes
+        return cls(countries, indicators, years, c[r], i[r], y, values[r, y])
+
+    def _arrays(self):
+        return (self.country_codes, self.indicator_codes, self.year_codes, self.values)
+
+    def _indicator_mask(self, indicator):
+        if indicator is None or indicator == TOTAL:
+            return slice(None)
+        return self.indicator_codes == self.indicator_index[indicator]
+
+    # Row sums: total occurrences per country, of one disaster type or (None / 'TOTAL') of all.
+
+    def country_totals(self, indicator=None):
+        mask = self._indicator_mask(indicator)
+        return np.bincount(self.country_codes[mask], weights=self.values[mask], minlength=len(self.countries))
+
+    # The k countries with the most occurrences of a disaster type (or of all), largest first.
+
+    def top_countries(self, k, indicator=None):
+        totals = self.country_totals(indicator)
+        top = top_k(totals, k)
+        return pd.DataFrame({'Country': self.countries[top], 'Total': totals[top]})
+
+
+# Positions of the k largest values, largest first, without sorting the whole array; ties keep the original order.
+
+def top_k(values, k):
+    k = min(k, len(values))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    if k < len(values):
+        # Values tied with the k-th largest are taken in index order, so the result does not depend on how argpartition splits ties.
+        threshold = np.partition(values, len(values) - k)[len(values) - k]
+        above = np.flatnonzero(values > threshold)
+        candidates = np.concatenate([above, np.flatnonzero(values == threshold)[:k - len(above)]])
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.lexsort((candidates, -values[candidates]))]
+
+
+def sparse_counts():
+    return data_store.derived("Main.csv", "sparse", SparseCounts.from_wide)
@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+import data_store
+
+# Paginated viewer for the raw dataset tables. st.write(frame) sends every row to the browser on every rerun; here sorting, filtering and column selection happen on the server and only the requested page of rows is sent.
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+# Row order of a dataset sorted by one column, computed once per dataset version.
+
+def sort_order(name, column, ascending):
+    def build(frame):
+        order = frame[column].sort_values(ascending=ascending, kind='stable', na_position='last').index
+        return frame.index.get_indexer(order)
+
+    return data_store.derived(name, ("sort_order", column, ascending), build)
+
+
+# Positions of the rows of a dataset whose `filter_column` contains the text (case-insensitive), in sorted order.
+
+def matching_rows(name, sort_by=None, ascending=True, filter_column=None, contains=""):
+    frame = data_store.load(name)
+    positions = np.arange(len(frame)) if sort_by is None else sort_order(name, sort_by, ascending)
+
+    if filter_column is not None and contains:
+        matches = frame[filter_column].astype(str).str.contains(contains, case=False, regex=False).to_numpy()
+        positions = positions[matches[positions]]
+    return positions
+
+
+def render_table(name):
+    frame = data_store.load(name)
+    all_columns = list(frame.columns)
+
+    columns = st.multiselect("Columns", all_columns, default=all_columns, key=f"{name}_columns")
+    left, middle, right = st.columns(3)
+    sort_by = left.selectbox("Sort by", [None] + all_columns, format_func=lambda c: "(file order)" if c is None else c, key=f"{name}_sort")
+    ascending = not middle.checkbox("Descending", key=f"{name}_descending")
+    page_size = right.selectbox("Rows per page", PAGE_SIZES, key=f"{name}_page_size")
+
+    left, right = st.columns(2)
+    filter_column = left.selectbox("Filter column", all_columns, index=all_columns.index('Country') if 'Country' in all_columns else 0, key=f"{name}_filter_column")
+    contains = right.text_input("Contains", key=f"{name}_contains")
+
+    positions = matching_rows(name, sort_by, ascending, filter_column, contains)
+    n_pages = max(1, math.ceil(len(positions) / page_size))
+    page = min(int(st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"{name}_page")), n_pages)
+
+    start = (page - 1) * page_size
+    rows = frame.iloc[positions[start:start + page_size]][columns or all_columns]
+    st.dataframe(rows)
+    st.caption(f"Rows {start + 1 if len(rows) else 0}–{start + len(rows)} of {len(positions)} (page {page} of {n_pages})")
@@ -0,0 +1,117 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+import data_store
+
+# Trend and anomaly statistics of every (Country, Indicator) row of Main.csv, computed for all rows at once on the count matrix instead of one series at a time:
+#
+#   rolling means     mean of each WINDOW-year window (cumulative sums)
+#   z-scores          each year's count against the row's mean and standard deviation; |z| >= Z_THRESHOLD is an anomaly
+#   Mann-Kendall      S statistic over all year pairs, its tie-corrected normal approximation and two-sided p-value
+#   Sen's slope       median slope over all year pairs, a trend per year that is robust to single outlying years
+#
+# The results are derived values of Main.csv, so they are computed once per dataset version and dropped with it.
+
+WINDOW = 3
+Z_THRESHOLD = 2.0
+ALPHA = 0.05
+# Rows per pass of the pairwise statistics, which take rows x years^2 memory.
+BATCH = 4096
+
+
+def rolling_means(values, window=WINDOW):
+    cumulative = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+    return (cumulative[:, window:] - cumulative[:, :-window]) / window
+
+
+def z_scores(values):
+    std = values.std(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std > 0, (values - values.mean(axis=1, keepdims=True)) / std, 0.0)
+
+
+# Mann-Kendall S, Z and two-sided p-value of every row.
+
+def mann_kendall(values):
+    n_rows, n = values.shape
+    i, j = np.triu_indices(n, k=1)
+    s = np.sign(values[:, j] - values[:, i]).sum(axis=1)
+
+    # Tie correction: every value tied t times contributes (t - 1)(2t + 5) once per member, i.e. t(t - 1)(2t + 5) per group.
+    ties = (values[:, :, None] == values[:, None, :]).sum(axis=2)
+    variance = (n * (n - 1) * (2 * n + 5) - ((ties - 1) * (2 * ties + 5)).sum(axis=1)) / 18
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(variance > 0, (s - np.sign(s)) / np.sqrt(variance), 0.0)
+    p = np.vectorize(math.erfc, otypes=[float])(np.abs(z) / math.sqrt(2))
+    return s, z, p
+
+
+# Sen's slope (median of the pairwise slopes) of every row, in counts per year.
+
+def sens_slope(values):
+    i, j = np.triu_indices(values.shape[1], k=1)
+    return np.median((values[:, j] - values[:, i]) / (j - i), axis=1)
+
+
+class Trends:
+
+    def __init__(self, main):
+        self.years = data_store.year_columns(main)
+        values = main[self.years].to_numpy(dtype=np.float64)
+        self.values = values
+        self.rolling = rolling_means(values)
+        self.z = z_scores(values)
+
+        blocks = [values[start:start + BATCH] for start in range(0, len(values), BATCH)]
+        s, z, p = (np.concatenate(part) for part in zip(*map(mann_kendall, blocks)))
+        slope = np.concatenate([sens_slope(block) for block in blocks])
+        peak = np.abs(self.z).argmax(axis=1)
+        self.summary = pd.DataFrame({
+            'Country': main['Country'].to_numpy(),
+            'Indicator': main['Indicator'].to_numpy(),
+            'Total': main['Total'].to_numpy(),
+            "Sen's slope": slope,
+            'Change over period': slope * (len(self.years) - 1),
+            'Mann-Kendall S': s,
+            'Mann-Kendall Z': z,
+            'p-value': p,
+            'Trend': np.select([(p < ALPHA) & (s > 0), (p < ALPHA) & (s < 0)], ['increasing', 'decreasing'], 'no trend'),
+            'Latest z-score': self.z[:, -1],
+            'Largest anomaly': np.array(self.years)[peak],
+            'Largest anomaly z': self.z[np.arange(len(values)), peak],
+            'Anomalies': (np.abs(self.z) >= Z_THRESHOLD).sum(axis=1),
+        })
+        self._rows = {pair: i for i, pair in enumerate(zip(self.summary['Country'], self.summary['Indicator']))}
+
+    # Rows ranked by the absolute value of one summary column, largest first. `indicators` limits the disaster types, `significant` keeps only rows with a Mann-Kendall trend at level ALPHA.
+
+    def biggest_changes(self, by="Sen's slope", indicators=None, significant=False, n=20):
+        rows = self.summary
+        if indicators is not None:
+            rows = rows[rows['Indicator'].isin(indicators)]
+        if significant:
+            rows = rows[rows['p-value'] < ALPHA]
+        order = np.argsort(-rows[by].abs().to_numpy(), kind='stable')[:n]
+        return rows.iloc[order].reset_index(drop=True)
+
+    # Yearly counts of one row with its rolling mean and z-scores; None if Main.csv has no such row.
+
+    def series(self, country, indicator):
+        row = self._rows.get((country, indicator))
+        if row is None:
+            return None
+        rolling = np.full(len(self.years), np.nan)
+        rolling[WINDOW - 1:] = self.rolling[row]
+        return pd.DataFrame({
+            'Year': self.years,
+            'Count': self.values[row],
+            'Rolling mean': rolling,
+            'z-score': self.z[row],
+            'Anomaly': np.abs(self.z[row]) >= Z_THRESHOLD,
+        })
+
+
+def trends():
+    return data_store.derived("Main.csv", "trends", Trends)
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+
+import data_store
+import aggregates
+import charts
+import hazard_pages
+import similarity
+import sparse_counts
+
+# Warm-up of the process-wide caches. Without it the first user after a deploy pays for every CSV parse, aggregate, chart and forecast the pages need. start() is called by streamlit_app.main() on the first rerun in the server process and returns at once: a background thread loads the datasets, builds the aggregates and the charts of every page with its default selections ("United States"/"India" and the first country on the disaster pages, the map and tables of Disaster Analytics), then fills the forecasts, starting with "United States"/"Storm" in every model. Each step is logged with its duration and the elapsed time. Sessions that arrive during the warm-up just find some values already cached; nothing waits for it.
+#
+# Set WARMUP=0 to switch it off (e.g. for benchmarks). "python warmup.py" runs the same steps in the foreground, which fills the on-disk forecast cache before the server starts.
+
+logger = logging.getLogger("warmup")
+
+DEFAULT_COUNTRIES = ["United States", "India"]
+PREDICTION_DEFAULT = ("United States", "Storm")
+# Worker processes for the ARIMA forecasts of all series (0 skips them); one keeps the server responsive while they run.
+FORECAST_WORKERS = 1
+
+_started = False
+_lock = threading.Lock()
+
+
+def _datasets():
+    for name in ("Main.csv", "Original.csv"):
+        data_store.load(name)
+
+
+def _aggregates():
+    aggregates.cube()
+    data_store.wide_table()
+    data_store.long_table()
+    data_store.iso3_codes()
+    sparse_counts.sparse_counts()
+
+
+def _overview():
+    import trends
+    import streamlit_app
+
+    # The three country selectboxes default to the first country of Main.csv.
+    country = data_store.load_main()['Country'].iloc[0]
+    streamlit_app.country_total_chart(country)
+    streamlit_app.country_trend_chart(country)
+    streamlit_app.country_breakdown_chart(country)
+    cube = aggregates.cube()
+    charts.choropleth('TOTAL', range_color=(0, cube.country_totals('TOTAL')['Total'].max()), width=800, height=600)
+    trends.trends()
+
+
+def _hazard(hazard):
+    def build():
+        countries = data_store.hazard(hazard.indicator)['Country'].unique()
+        hazard_pages.frequency_chart(hazard, DEFAULT_COUNTRIES)
+        hazard_pages.country_chart(hazard, countries[0])
+        hazard_pages.bubble_chart(hazard)
+        charts.choropleth(hazard.indicator, scope='world')
+        charts.year_share_pie(hazard.indicator)
+        similar = similarity.similar(countries[0], hazard.indicator)
+        if not similar.empty:
+            hazard_pages.similar_chart(hazard, countries[0], similar['Country'].tolist())
+
+    return build
+
+
+def _default_forecasts():
+    import forecasting
+
+    country, indicator = PREDICTION_DEFAULT
+    for method in forecasting.METHODS:
+        forecasting.forecast(country, indicator, method=method)
+
+
+def _all_forecasts(workers):
+    import forecasting
+
+    if workers:
+        forecasting.forecast_all(workers=workers)
+
+
+def steps(forecast_workers=FORECAST_WORKERS):
+    return [
+        ("datasets", _datasets),
+        ("aggregates", _aggregates),
+        ("Disaster Analytics", _overview),
+        *[(label, _hazard(hazard)) for label, hazard in hazard_pages.HAZARDS.items()],
+        ("default forecasts", _default_forecasts),
+        ("all ARIMA forecasts", lambda: _all_forecasts(forecast_workers)),
+    ]
+
+
+# Runs every step in order, logging progress. A failing step is logged and skipped; the pages build that value on demand.
+
+def run(forecast_workers=FORECAST_WORKERS):
+    start = time.perf_counter()
+    plan = steps(forecast_workers)
+    for number, (name, step) in enumerate(plan, 1):
+        step_start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up [%d/%d] %s failed", number, len(plan), name)
+            continue
+        logger.info("Warm-up [%d/%d] %s: %.2fs (elapsed %.2fs)", number, len(plan), name, time.perf_counter() - step_start, time.perf_counter() - start)
+    logger.info("Warm-up done in %.2fs", time.perf_counter() - start)
+
+
+# Starts the warm-up thread once per process.
+
+def start():
+    global _started
+    if os.environ.get("WARMUP") == "0":
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+
+    # Streamlit only configures its own loggers; make sure the progress reaches the server log.
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+    logger.info("Warm-up started")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dashboard's caches and forecasts ahead of the first user.")
+    parser.add_argument("--forecast-workers", type=int, default=os.cpu_count(), help="worker processes for the ARIMA forecasts of all series (0 to skip)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    run(args.forecast_workers)
+
+
+if __name__ == "__main__":
+    main()